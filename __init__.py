@@ -37,11 +37,14 @@ import bl_ui
 import re
 
 if "bpy" in locals():
-    for module in main, menu, operator, listview, panel:
+    for module in profiling, tree, main, sync, util, stats, transaction, layout, menu, operator, listview, panel:
         importlib.reload(module)
 else:
     import bpy
-    from . import main, menu, operator, listview, panel
+    from . import profiling, tree, main, sync, util, stats, transaction, layout, menu, operator, listview, panel
+
+from .transaction import batch
+from .layout import export_layout, apply_layout, save_manifest, load_manifest
 
 
 from bpy.types import bpy_struct
@@ -66,53 +69,65 @@ class AddonSettings(bpy.types.AddonPreferences):
         else:
             bpy.utils.register_class(bl_ui.properties_data_mesh.DATA_PT_shape_keys)
     
+    profiling_enabled: bpy.props.BoolProperty(name="Profiling",
+        description="Record call counts and timings of the add-on hot paths",
+        default=False, update=lambda x, a: profiling.set_enabled(x.profiling_enabled)
+    )
+    
     def draw(self, context):
         row = self.layout.row()
         row.prop(self, 'hide_default')
         row.prop(self, 'shape_key_indent_scale')
-
-
-def sync_node_shapekeys():
-    for obj in bpy.context.scene.objects:
-        existing_nodes = set(x.path for x in obj.extra_props.shapenodes)
-        existing_shapekeys = set()
         
-        #print(f'sync_node_shapekeys() INFO: {obj}, existing_nodes {existing_nodes}')
-        if getattr(obj.data, 'shape_keys', None):
-            existing_shapekeys = set(x.name for x in obj.data.shape_keys.key_blocks.values())
-            #print(f'sync_node_shapekeys() INFO: {obj}, existing_shapekeys {existing_shapekeys}')
-            for id, shapekey in obj.data.shape_keys.key_blocks.items():
-                if shapekey.name in existing_nodes:
-                    continue
-                print(f'sync_node_shapekeys() INFO: {obj}, adding {shapekey.name} to shape keys tree.')
-                if not shapekey.name.startswith('//'):
-                    shapekey.name = '//' + shapekey.name
-                node = obj.extra_props.shapenodes.add()
-                node.is_folder = False
-                node.path = shapekey.name
-            # New shapekeys now have //
-            existing_shapekeys = set(x.name for x in obj.data.shape_keys.key_blocks.values())
-            
-        #print(f'sync_node_shapekeys() INFO: {obj}, existing_shapekeys {existing_shapekeys}')
-        for node in list(main.NodeProxy(x.path) for x in obj.extra_props.shapenodes if not x.is_folder):
-            if node.path not in existing_shapekeys:
-                print(f'sync_node_shapekeys() WARN: {obj}, {node.path} shape key does not exist, removing the tree node.')
-                if node.index is None:
-                    print(f"sync_node_shapekeys() WARN: {obj}, {node.path} node alredy removed!")
-                else:
-                    obj.extra_props.shapenodes.remove(node.index)
-                #node.delete()
+        row = self.layout.row()
+        row.prop(self, 'profiling_enabled')
+        row.operator('skt.profiling_reset', text="Reset")
+        row.operator('skt.profiling_dump', text="Dump JSON")
+        
+        if not self.profiling_enabled:
+            return
+        
+        col = self.layout.column(align=True)
+        for name, stat in profiling.get_stats():
+            row = col.row()
+            row.label(text=name)
+            row.label(text=f"{stat.count} calls")
+            row.label(text=f"{stat.total * 1000:.1f} ms total")
+            row.label(text=f"{stat.total * 1000 / stat.count:.3f} ms avg")
+            row.label(text=f"{stat.max * 1000:.3f} ms max")
+            slowest = max(stat.objects.items(), key=lambda x: x[1][1], default=None)
+            row.label(text=f"{slowest[0]}: {slowest[1][1] * 1000:.1f} ms" if slowest else "")
+
 
 @persistent
-def depsgraph_update_post(*a):
+def depsgraph_update_post(scene, depsgraph=None):
     #print("depsgraph_update_post", a)
-    sync_node_shapekeys()
+    if depsgraph is None:
+        # Older blender versions pass only the scene to this handler.
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    updated = sync.get_updated_objects(scene, depsgraph)
+    if updated:
+        sync.schedule(updated)
+    for obj in updated:
+        # Key data could be changed by any operator or script, not only in edit modes.
+        stats.on_key_update(obj)
 
 
 @persistent
 def load_post(*a):
     #print("load_post", a)
-    sync_node_shapekeys()
+    main.clear_caches()
+    stats.clear()
+    sync.cancel()
+    sync.sync_now()
+
+
+@persistent
+def undo_post(*a):
+    # Undo and redo replace objects data, cached tree indices are no longer valid.
+    main.clear_caches()
+    stats.clear()
+    sync.clear_fingerprints()
 
 
 def classes():
@@ -123,9 +138,17 @@ def classes():
                 yield cls
 
 
+def instrument():
+    profiling.instrument(panel.DATA_PT_shape_keys_tree, 'draw', 'DATA_PT_shape_keys_tree.draw')
+    for cls in classes():
+        if getattr(cls, 'bl_idname', '').startswith('skt.'):
+            profiling.instrument(cls, 'execute', cls.bl_idname)
+
+
 def register():
     print("Register shape tree")
     
+    instrument()
     for klass in classes():
         bpy.utils.register_class(klass)
     
@@ -133,8 +156,11 @@ def register():
 
     bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post)
     bpy.app.handlers.load_post.append(load_post)
+    bpy.app.handlers.undo_post.append(undo_post)
+    bpy.app.handlers.redo_post.append(undo_post)
 
     preferences = bpy.context.preferences.addons['shape_tree'].preferences
+    profiling.set_enabled(preferences.profiling_enabled)
     
     if preferences.hide_default and hasattr(bpy.types, 'DATA_PT_shape_keys'):
         bpy.utils.unregister_class(bl_ui.properties_data_mesh.DATA_PT_shape_keys)
@@ -152,6 +178,10 @@ def unregister():
         
     bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post)
     bpy.app.handlers.load_post.remove(load_post)
+    bpy.app.handlers.undo_post.remove(undo_post)
+    bpy.app.handlers.redo_post.remove(undo_post)
+    sync.cancel()
+    stats.cancel()
 
     default_panel_exists = hasattr(bpy.types, 'DATA_PT_shape_keys')
     
@@ -0,0 +1,235 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Headless benchmarks of the shape keys tree hot paths on synthetic meshes. Run with:
+
+    blender --background --factory-startup --python benchmark.py -- --keys 1000 5000 20000 \
+        --depth 2 --fanout 8 --output results.json [--baseline baseline.json]
+
+The directory of this file is loaded as the add-on, so it has to be named shape_tree like an
+installed add-on. With --baseline, medians are compared to a saved result, and the exit code
+is 1 when any of them got slower than the threshold.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import addon_utils
+import bpy
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(description="Shape keys tree benchmarks")
+    parser.add_argument('--keys', type=int, nargs='+', default=[1000, 5000, 20000],
+                        help="Shape key counts of the generated meshes")
+    parser.add_argument('--depth', type=int, default=2, help="Levels of nested folders")
+    parser.add_argument('--fanout', type=int, default=8, help="Subfolders of each folder")
+    parser.add_argument('--vertices', type=int, default=256, help="Vertices of the mesh")
+    parser.add_argument('--ticked', type=float, default=0.1,
+                        help="Fraction of keys ticked for move, delete and mute")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="Save results to this JSON file")
+    parser.add_argument('--baseline', help="Compare with results saved by --output")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed slowdown against the baseline, 0.2 is 20%%")
+    return parser.parse_args(argv)
+
+
+def load_addon():
+    root = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(root))
+    name = os.path.basename(root)
+    if addon_utils.enable(name, default_set=True) is None:
+        sys.exit(f'benchmark() ERROR: can not enable add-on {name}')
+    return sys.modules[name]
+
+
+def get_folders(depth, fanout):
+    """ Paths of nested folders, parents first, and the folders which get the shape keys. """
+    levels = [['']]
+    for level in range(depth):
+        levels.append([f'{x}//F{level}_{n}' for x in levels[-1] for n in range(fanout)])
+    return [x for level in levels[1:] for x in level], levels[-1]
+
+
+def create_object(addon, name, keys, depth, fanout, vertices):
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata([(x, x % 16, 0) for x in range(vertices)], [], [])
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    
+    folders, leaves = get_folders(depth, fanout)
+    with addon.batch(obj) as tree:
+        tree.add_shape('//Basis')
+        for path in folders:
+            tree.add_folder(path)
+        for n in range(keys):
+            tree.add_shape(f'{leaves[n % len(leaves)]}//Key{n}')
+    return obj
+
+
+def clone_object(obj):
+    """ Copy of the object with its own mesh and shape keys, to run destructive benchmarks on. """
+    result = obj.copy()
+    result.data = obj.data.copy()
+    bpy.context.scene.collection.objects.link(result)
+    bpy.context.view_layer.objects.active = result
+    return result
+
+
+def remove_object(obj):
+    mesh = obj.data
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(mesh)
+
+
+def tick_fraction(addon, obj, fraction):
+    paths = [x.path for x in obj.extra_props.shapenodes if not x.is_folder and x.path != '//Basis']
+    step = max(1, round(1 / fraction)) if fraction > 0 else len(paths) + 1
+    addon.util.tick_nodes(obj, paths[::step])
+
+
+def measure(func, repeat, setup=None, teardown=None):
+    """ Run func(setup()) repeat times and return the timings in seconds. """
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        func(state)
+        timings.append(time.perf_counter() - start)
+        if teardown:
+            teardown(state)
+    return timings
+
+
+def run_benchmarks(addon, obj, args):
+    """ Yield (name, timings) of every benchmark on the object. """
+    main, sync, util, listview = addon.main, addon.sync, addon.util, addon.listview
+    ui_list = type('UIList', (), {'bitflag_filter_item': bpy.types.UIList.bitflag_filter_item})()
+    
+    def activate(obj):
+        bpy.context.view_layer.objects.active = obj
+        
+    def sync_all(_):
+        sync.clear_fingerprints()
+        sync.sync_node_shapekeys([obj])
+    
+    def filter_items(_):
+        listview._order_cache.clear()
+        listview._flags_cache.clear()
+        listview.MESH_UL_shape_keys_tree.filter_nodes(ui_list, bpy.context)
+        
+    def cold_caches():
+        activate(obj)
+        main.clear_caches()
+        
+    yield 'sync_node_shapekeys', measure(sync_all, args.repeat, cold_caches)
+    yield 'filter_items', measure(filter_items, args.repeat, cold_caches)
+    yield 'filter_items_cached', measure(
+        lambda _: listview.MESH_UL_shape_keys_tree.filter_nodes(ui_list, bpy.context), args.repeat
+    )
+    yield 'get_visible_nodes', measure(lambda _: list(util.get_visible_nodes()), args.repeat, cold_caches)
+    yield 'skt.select_all', measure(lambda _: bpy.ops.skt.select_all(), args.repeat, cold_caches)
+    
+    def remove_clone(clone):
+        # A new clone can get the address of the removed one, and caches are keyed by address.
+        remove_object(clone)
+        main.clear_caches()
+        
+    def ticked_clone():
+        clone = clone_object(obj)
+        tick_fraction(addon, clone, args.ticked)
+        return clone
+    
+    last_folder = get_folders(args.depth, args.fanout)[0][-1] if args.depth else ''
+    yield 'skt.move', measure(
+        lambda _: bpy.ops.skt.move(dst=last_folder), args.repeat, ticked_clone, remove_clone
+    )
+    yield 'skt.delete', measure(lambda _: bpy.ops.skt.delete(), args.repeat, ticked_clone, remove_clone)
+    yield 'skt.mute', measure(lambda _: bpy.ops.skt.mute(), args.repeat, ticked_clone, remove_clone)
+    
+    if args.depth:
+        def rename_folder(clone):
+            node = clone.extra_props.shapenodes[main.get_tree_index(clone).index['//F0_0']]
+            node.path = '//F0_0_renamed'
+        yield 'Node.on_path', measure(rename_folder, args.repeat, clone_object, remove_clone)
+    
+    activate(obj)
+
+
+def compare(results, baseline, threshold):
+    """ Print the change of every median against the baseline and return the regressions. """
+    regressions = []
+    for size, timings in results['results'].items():
+        for name, result in timings.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if not old:
+                continue
+            ratio = result['median'] / old['median'] if old['median'] else 1.0
+            mark = ''
+            if ratio > 1 + threshold:
+                regressions.append((size, name, ratio))
+                mark = '  REGRESSION'
+            print(f'{size:>8} {name:<24} {old["median"] * 1000:10.2f} ms -> '
+                  f'{result["median"] * 1000:10.2f} ms  {ratio:6.2f}x{mark}')
+    return regressions
+
+
+def main():
+    args = parse_args()
+    addon = load_addon()
+    results = {'args': vars(args), 'blender': bpy.app.version_string, 'results': {}}
+    
+    for keys in args.keys:
+        print(f'benchmark() INFO: creating object with {keys} shape keys')
+        start = time.perf_counter()
+        obj = create_object(addon, f'Benchmark{keys}', keys, args.depth, args.fanout, args.vertices)
+        print(f'benchmark() INFO: created in {time.perf_counter() - start:.2f} s')
+        
+        size_results = results['results'][str(keys)] = {}
+        for name, timings in run_benchmarks(addon, obj, args):
+            size_results[name] = {
+                'min': min(timings), 'median': statistics.median(timings), 'timings': timings
+            }
+            print(f'{keys:>8} {name:<24} {statistics.median(timings) * 1000:10.2f} ms')
+        remove_object(obj)
+        addon.main.clear_caches()
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'benchmark() INFO: results saved to {args.output}')
+        
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'benchmark() WARN: {len(regressions)} regressions over {args.threshold:.0%}')
+            sys.exit(1)
+            
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Export of tree layouts to manifest files and applying them to other objects:
+
+    manifest = shape_tree.export_layout(bpy.data.objects['Body'])
+    shape_tree.save_manifest(manifest, '//body_layout.json.gz')
+    
+    for obj in variants:
+        shape_tree.apply_layout(obj, shape_tree.load_manifest('//body_layout.json.gz'))
+"""
+
+import bpy
+import gzip
+import json
+
+from . import main, sync, util
+from .tree import Tree
+
+
+MANIFEST_VERSION = 1
+
+
+def export_layout(obj):
+    """ Manifest of the object's tree layout, see tree.Tree.get_layout(). """
+    layout = Tree(main.CollectionStorage(obj)).get_layout()
+    return dict(layout, version=MANIFEST_VERSION)
+
+
+def apply_layout(obj, manifest, conflicts=None):
+    """
+    Create folders, move shape keys into them and set collapse and mute states as in the 
+    manifest, in one pass. Shape keys are matched by path, or by name without folders when it
+    is unambiguous, and are never renamed: paths of keys which could not be moved are appended
+    to conflicts, if a list is given. Return the number of changed tree nodes. Raise ValueError,
+    before any change, if a shape key of the object is in place of a folder of the manifest.
+    """
+    # Nodes of shape keys, which were added since the last sync, are needed for matching.
+    sync.sync_now([obj])
+    skipped = []
+    with sync.suspended():
+        changed = Tree(main.CollectionStorage(obj)).set_layout(manifest, skipped)
+    print(f'apply_layout() INFO: {obj}, {changed} tree nodes changed.')
+    if skipped:
+        print(f'apply_layout() WARN: {obj}, shape keys not moved, their label is ambiguous or '
+              f'their path is taken: {skipped}')
+        if conflicts is not None:
+            conflicts.extend(skipped)
+    sync.sync_now([obj])
+    util.tag_redraw()
+    return changed
+
+
+def save_manifest(manifest, filepath):
+    """ Save as compact JSON, gzip compressed if filepath ends with .gz. """
+    data = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+    if filepath.endswith('.gz'):
+        data = gzip.compress(data)
+    with open(bpy.path.abspath(filepath), 'wb') as f:
+        f.write(data)
+        
+        
+def load_manifest(filepath):
+    """ Load a manifest saved by save_manifest(). Raise ValueError for unknown formats. """
+    with open(bpy.path.abspath(filepath), 'rb') as f:
+        data = f.read()
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    manifest = json.loads(data.decode('utf-8'))
+    if not isinstance(manifest, dict):
+        raise ValueError("Manifest is not a JSON object")
+    version = manifest.get('version', MANIFEST_VERSION)
+    if not isinstance(version, int):
+        raise ValueError(f"Manifest version {version!r} is not a number")
+    if version > MANIFEST_VERSION:
+        raise ValueError(f"Manifest version {version} is not supported")
+    
+    for name in ('folders', 'collapsed', 'muted'):
+        if not _is_list_of_str(manifest.get(name)):
+            raise ValueError(f"Manifest '{name}' is not a list of paths")
+    keys = manifest.get('keys')
+    if not isinstance(keys, dict) or not all(
+        isinstance(k, str) and _is_list_of_str(v) for k, v in keys.items()
+    ):
+        raise ValueError("Manifest 'keys' is not a mapping of folder paths to lists of names")
+    return manifest
+
+
+def _is_list_of_str(value):
+    return isinstance(value, list) and all(isinstance(x, str) for x in value)
@@ -20,12 +20,18 @@
 import bpy
 import bl_ui
 
-from . import util
+from . import main, profiling, stats, util
 from .util import op
+from .tree import Tree
 
 
 class MESH_UL_shape_keys_tree(bpy.types.UIList):
     def draw_item(self, context, layout, data, shapenode, icon, active_data, active_propname, index):
+        with profiling.measure('draw_item'):
+            self.draw_node(context, layout, shapenode, index)
+    
+    
+    def draw_node(self, context, layout, shapenode, index):
         #obj = context.object
         #use_edit_mode = obj.use_shape_key_edit_mode and obj.type == 'MESH'
         
@@ -33,13 +39,15 @@ class MESH_UL_shape_keys_tree(bpy.types.UIList):
         
         row = layout.row(align=True)
         
+        tree = main.get_tree_index(context.object)
+        
         row.alignment = 'LEFT'
-        for x in range((shapenode.path.count('//') - 1) * prefs.shape_key_indent_scale):
+        for x in range(tree.depth[index] * prefs.shape_key_indent_scale):
             row.separator(factor=1)
         
         if shapenode.is_folder:
             row.separator_spacer()
-            op(row, 'skt.folder_toggle', text='', emboss=len(list(shapenode.children)) > 0,
+            op(row, 'skt.folder_toggle', text='', emboss=bool(tree.get_children(shapenode.path)),
                icon='TRIA_RIGHT' if shapenode.is_collapsed else 'TRIA_DOWN', op_index=index
             )
         elif not shapenode.shapekey:
@@ -49,6 +57,19 @@ class MESH_UL_shape_keys_tree(bpy.types.UIList):
         #row.prop(shapenode, 'path', text="", emboss=False)
         row.prop(shapenode, 'label', text="", emboss=False)
         
+        if context.object.extra_props.driver_audit_visible:
+            if shapenode.is_folder:
+                count = util.get_slow_driver_count(context.object, shapenode.path)
+                if count:
+                    row.label(text=str(count), icon='ERROR')
+            elif (util.get_driver_audit(context.object) or {}).get(shapenode.path):
+                row.label(text="", icon='ERROR')
+                
+        if context.object.extra_props.stats_visible:
+            row.label(text=stats.format_stats(
+                stats.get_node_stats(context.object, shapenode.path, shapenode.is_folder)
+            ))
+        
         row = layout.row(align=True)
         
         if shapenode.is_folder:
@@ -70,6 +91,9 @@ class MESH_UL_shape_keys_tree(bpy.types.UIList):
             if not shapenode.shapekey.id_data.use_relative:
                 row.prop(shapenode.shapekey, 'frame', text="", emboss=False)
                 
+            if util.get_key_driver(context.object, shapenode.path):
+                row.label(text="", icon='DRIVER')
+                
             if not shapenode.path == '//Basis':
                 #print(shapenode.shapekey.id_data.animation_data.drivers[0].driver)
                 #if shapenode.shapekey.id_data.animation_data.drivers[0].driver:
@@ -112,21 +136,45 @@ class MESH_UL_shape_keys_tree(bpy.types.UIList):
     
     
     def filter_items(self, context, data, propname):
-        shapenodes = context.object.extra_props.shapenodes
+        with profiling.measure('filter_items'):
+            return self.filter_nodes(context)
+    
+    
+    def filter_nodes(self, context):
+        obj = context.object
+        props = obj.extra_props
+        shapenodes = props.shapenodes
         
-        def sortorder(x):
-            if x.path == '//Basis':
-                return '0'  # Show "Basis" always on the top of the list.
-            # Folders first: prepend foders with 0, shapekeys with 1
-            path = '//0'.join(x.path.split('//')[:-1]) + ('//0' if x.is_folder else '//1')
-            return f'1//{path}{x.label}'
+        # Sort order depends only on tree structure, visibility also on collapsed folders and 
+        # filter settings. Both are cached, so that redraws of an unchanged tree are cheap.
+        generation = (main.get_generation(obj), len(shapenodes))
         
-        indices = {x.path: n for n, x in enumerate(sorted(shapenodes, key=sortorder))}
+        cached = _order_cache.get(obj.as_pointer())
+        if cached and cached[0] == generation:
+            order = cached[1]
+        else:
+            order = Tree(main.CollectionStorage(obj)).get_sort_order()
+            _order_cache[obj.as_pointer()] = (generation, order)
         
-        visible = set(x.path for x in util.get_visible_nodes())
-        return (
-            [self.bitflag_filter_item if x.path in visible else 0 for x in shapenodes], 
-            [indices.get(x.path) for x in shapenodes]
+        filter_state = (
+            generation, main.get_view_generation(obj), props.name_filter, props.name_filter_invert,
+            props.value_filter, props.value_filter_threshold, props.value_filter_direction
         )
-    
-    
+        if props.value_filter:
+            # Shape key values change without notice (e.g. during playback), compare them too.
+            filter_state += (util.get_shapekey_values(obj).tobytes(),)
+            
+        cached = _flags_cache.get(obj.as_pointer())
+        if cached and cached[0] == filter_state:
+            flags = cached[1]
+        else:
+            visible = set(x.path for x in util.get_visible_nodes(obj))
+            flags = [self.bitflag_filter_item if x.path in visible else 0 for x in shapenodes]
+            _flags_cache[obj.as_pointer()] = (filter_state, flags)
+        
+        return flags, order
+
+
+# Object.as_pointer() -> (state, result) of the last MESH_UL_shape_keys_tree.filter_items() call.
+_order_cache = {}
+_flags_cache = {}
@@ -19,8 +19,154 @@
 
 import bpy
 import bl_ui
+import itertools
+import numpy
 from bpy.props import BoolProperty, IntProperty, CollectionProperty, StringProperty, FloatProperty
 
+from .tree import TreeIndex, NameAllocator, Storage, Tree
+
+
+# Blender does not notify about changes in a CollectionProperty, so every piece of code which adds,
+# removes or renames tree nodes must call tree_changed(obj) afterwards. That bumps the generation
+# of the object's tree, and cached TreeIndex gets rebuilt on next access. All dicts are keyed
+# by Object.as_pointer(). Memory of a removed object can be reused by a new one, so the names
+# of the object and its data are kept as well, and the generation is bumped when they differ.
+_generation_counter = itertools.count(1)
+_base_generation = 0
+_generations = {}
+_owners = {}
+_tree_indices = {}
+_shapekey_indices = {}
+_name_allocators = {}
+# Same for changes which affect only what is shown, like collapsing a folder.
+_view_generations = {}
+
+
+def tree_changed(obj, allocator=None):
+    """
+    Pass the NameAllocator of the object, if the caller took and released names through it.
+    Otherwise the allocator is rebuilt on next use.
+    """
+    _check_owner(obj)
+    _generations[obj.as_pointer()] = next(_generation_counter)
+    if allocator is not None:
+        allocator.generation = get_generation(obj)
+    
+    
+def get_generation(obj):
+    _check_owner(obj)
+    return _generations.get(obj.as_pointer(), _base_generation)
+
+
+def _check_owner(obj):
+    owner = (obj.name_full, obj.data.name_full if obj.data else '')
+    if _owners.get(obj.as_pointer()) != owner:
+        # Another object at this address, or the same one renamed: cached data is not trusted.
+        _owners[obj.as_pointer()] = owner
+        _generations[obj.as_pointer()] = next(_generation_counter)
+        _view_generations[obj.as_pointer()] = next(_generation_counter)
+
+
+def view_changed(obj):
+    _view_generations[obj.as_pointer()] = next(_generation_counter)
+
+
+def get_view_generation(obj):
+    return _view_generations.get(obj.as_pointer(), _base_generation)
+
+
+def clear_caches():
+    """
+    Forget all cached tree data. Called when undo or file load replaces objects under our feet.
+    """
+    global _base_generation
+    _base_generation = next(_generation_counter)
+    _generations.clear()
+    _owners.clear()
+    _tree_indices.clear()
+    _shapekey_indices.clear()
+    _pose_indices.clear()
+    _name_allocators.clear()
+    _view_generations.clear()
+
+
+def get_tree_index(obj) -> TreeIndex:
+    shapenodes = obj.extra_props.shapenodes
+    generation = get_generation(obj)
+    
+    tree = _tree_indices.get(obj.as_pointer())
+    if tree is None or tree.generation != generation or len(tree.paths) != len(shapenodes):
+        tree = TreeIndex([x.path for x in shapenodes])
+        tree.generation = generation
+        _tree_indices[obj.as_pointer()] = tree
+    return tree
+
+
+def get_name_allocator(obj) -> NameAllocator:
+    allocator = _name_allocators.get(obj.as_pointer())
+    if allocator is None or allocator.generation != get_generation(obj):
+        allocator = NameAllocator(get_tree_index(obj).index)
+        allocator.generation = get_generation(obj)
+        _name_allocators[obj.as_pointer()] = allocator
+    return allocator
+
+
+def get_shapekeys_fingerprint(obj):
+    """
+    Count and hash of key block names of the object, or None without shape keys. Changes when
+    keys are added, removed, renamed or reordered.
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    if not shape_keys:
+        return None
+    names = tuple(shape_keys.key_blocks.keys())
+    return len(names), hash(names)
+
+
+def get_shapekey_indices(obj):
+    """
+    Numpy array with index of the key block of every tree node, -1 for folders and nodes without
+    shape key. Cached until the tree changes, or key blocks are added, removed, renamed or
+    reordered, e.g. by Blender's own shape keys panel.
+    """
+    shapenodes = obj.extra_props.shapenodes
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    state = (get_generation(obj), len(shapenodes), get_shapekeys_fingerprint(obj))
+    
+    cached = _shapekey_indices.get(obj.as_pointer())
+    if cached and cached[0] == state:
+        return cached[1]
+    
+    names = {name: n for n, name in enumerate(shape_keys.key_blocks.keys())} if shape_keys else {}
+    indices = numpy.array(
+        [-1 if x.is_folder else names.get(x.path, -1) for x in shapenodes], dtype=numpy.int32
+    )
+    _shapekey_indices[obj.as_pointer()] = (state, indices)
+    return indices
+
+
+def get_shapekey_values(obj):
+    """
+    Numpy array of values of all key blocks of the object, read in one call.
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    if not shape_keys:
+        return numpy.empty(0, dtype=numpy.float32)
+    values = numpy.empty(len(shape_keys.key_blocks), dtype=numpy.float32)
+    shape_keys.key_blocks.foreach_get('value', values)
+    return values
+
+
+def get_node_index(obj, path):
+    """
+    Return index of the tree node with given path in obj.extra_props.shapenodes, or None.
+    """
+    index = get_tree_index(obj).index.get(path)
+    if index is not None and obj.extra_props.shapenodes[index].path != path:
+        # Tree was modified without calling tree_changed(), rebuild the index.
+        tree_changed(obj)
+        index = get_tree_index(obj).index.get(path)
+    return index
 
     
 class NodeProxy:
@@ -38,9 +184,19 @@ class NodeProxy:
     So in many places it is more convenient to use this class instead of using Node. This class
     always refers to an node with a certain path, passing down attribute access to the 
     appropriate Node.
+    
+    A proxy is bound to an object, the active one by default, so it keeps working when another
+    object gets active. Index of the node is cached and looked up again only after the tree of
+    the object changed, see tree_changed().
     """
-    def __init__(self, path):
+    __slots__ = ('_obj', '_path', '_index', '_generation')
+    
+    def __init__(self, path, obj=None, index=None):
+        """ Pass the index of the node, if it is known already. """
+        self._obj = obj or bpy.context.object
         self._path = path
+        self._index = index
+        self._generation = get_generation(self._obj) if index is not None else None
         
     def __repr__(self):
         return f'NodeProxy({self._path})'
@@ -48,59 +204,224 @@ class NodeProxy:
     def __setattr__(self, name, val):
         if name.startswith('_'):
             return super().__setattr__(name, val)
-        setattr(bpy.context.object.extra_props.shapenodes[self.index], name, val)
+        node = self._obj.extra_props.shapenodes[self.index]
+        setattr(node, name, val)
         if name == 'path':
-            self._path = val
+            # Path could get a suffix, or "//" prepended.
+            self._path = node.path
             
     def __getattr__(self, name):
+        # Called only for attributes not found on the proxy itself, i.e. those of the Node.
         if name.startswith('_'):
-            return super().__getattr__(name)
-        if name == 'path':
-            return self._path
-        if name == 'delete':
-            return self.delete
-        if name in self.__class__.__dict__:
-            return super().__getattr__(name)
-        #print(f'__getattr__ {name}')
-        return getattr(bpy.context.object.extra_props.shapenodes[self.index], name)
-            
+            raise AttributeError(name)
+        return getattr(self._obj.extra_props.shapenodes[self.index], name)
+    
+    @property
+    def path(self):
+        return self._path
+    
     @property
     def index(self):
-        #existing_nodes = set(x.path for x in bpy.context.object.extra_props.shapenodes)
-        #print(f'NodeProxy.index() INFO: {bpy.context.object}, {existing_nodes}')
-        for n, node in enumerate(bpy.context.object.extra_props.shapenodes):
-            if node.path == self.path:
-                return n
+        if self._generation != get_generation(self._obj):
+            self._index = get_node_index(self._obj, self._path)
+            # Lookup may find the tree modified and bump the generation itself.
+            self._generation = get_generation(self._obj)
+        return self._index
 
     def delete(self):
-        #print(f"Node.delete() INFO: about to remove tree node {self.path} with index {self.index}")
-        for node in self.children:
-            node.delete()
-        if not self.is_folder:
-            if self.path == '//Basis' and len(bpy.context.object.data.shape_keys.key_blocks) > 1:
-                return
-            if self.sk_index >= 0:
-                print(f"Node.delete() INFO: about to remove shape key with path {self.path}.")
-                bpy.context.object.active_shape_key_index = self.sk_index
-                # There is an issue to keep in mind, that calling bpy.ops.object.shape_key_remove(), will
-                # immediately execute depsgraph_update_post() handler, calling __init__.sync_node_shapekeys(),
-                # which will see that shape key was just removed, and try to remove this tree node.
-                # After tree node gets removed in __init__.sync_node_shapekeys(), this function will proceed
-                # and self.index of this NodeProxy will be None.
-                bpy.ops.object.shape_key_remove()
-                print(f"Node.delete() INFO: shape key with path {self.path} removed.")
-        if self.index:
-            print(f"Node.delete() INFO: removing tree node {self.path} with index {self.index}")
-            bpy.context.object.extra_props.shapenodes.remove(self.index)
+        delete_nodes(self._obj, [self._path])
     
 
+class CollectionStorage(Storage):
+    """
+    Tree nodes of an object, stored in obj.extra_props.shapenodes. Shape keys follow their nodes:
+    they are renamed, muted, added and removed along with them. Index and allocator are the
+    cached ones of get_tree_index() and get_name_allocator().
+    """
+    def __init__(self, obj):
+        self.obj = obj
+        self.shapenodes = obj.extra_props.shapenodes
+        
+    def get_paths(self):
+        return [x.path for x in self.shapenodes]
+    
+    def get_index(self):
+        return get_tree_index(self.obj)
+    
+    def get_allocator(self):
+        return get_name_allocator(self.obj)
+    
+    def changed(self, allocator=None):
+        tree_changed(self.obj, allocator)
+        
+    def get_reference_index(self):
+        shape_keys = getattr(self.obj.data, 'shape_keys', None)
+        return self.get_index().index.get(shape_keys.reference_key.name) if shape_keys else None
+        
+    def get_flags(self, name):
+        """ is_muted of nodes with a shape key is the key's own mute, which Blender can change. """
+        flags = numpy.empty(len(self.shapenodes), dtype=bool)
+        self.shapenodes.foreach_get(name, flags)
+        
+        shape_keys = getattr(self.obj.data, 'shape_keys', None)
+        if name == 'is_muted' and shape_keys:
+            sk_indices = get_shapekey_indices(self.obj)
+            mute = numpy.empty(len(shape_keys.key_blocks), dtype=bool)
+            shape_keys.key_blocks.foreach_get('mute', mute)
+            has_key = sk_indices >= 0
+            flags[has_key] = mute[sk_indices[has_key]]
+        return flags
+    
+    def set_flags(self, indices, name, value):
+        """
+        Flags are stored directly, without triggering Node update callbacks. is_muted of nodes
+        with a shape key is written to the key only, with one foreach_set.
+        """
+        shape_keys = getattr(self.obj.data, 'shape_keys', None)
+        sk_indices = get_shapekey_indices(self.obj) if shape_keys else None
+        for index in indices:
+            if name != 'is_muted' or sk_indices is None or sk_indices[index] < 0:
+                self.shapenodes[index][name] = value
+        
+        if name == 'is_collapsed':
+            view_changed(self.obj)
+        
+        if name == 'is_muted' and shape_keys:
+            sk_indices = sk_indices[sorted(indices)]
+            mute = numpy.empty(len(shape_keys.key_blocks), dtype=bool)
+            shape_keys.key_blocks.foreach_get('mute', mute)
+            mute[sk_indices[sk_indices >= 0]] = value
+            shape_keys.key_blocks.foreach_set('mute', mute)
+            shape_keys.update_tag()
+    
+    def set_paths(self, paths):
+        tree = self.get_index()
+        new_paths = {tree.index[old]: new for old, new in paths.items()}
+        
+        shape_keys = getattr(self.obj.data, 'shape_keys', None)
+        if shape_keys:
+            sk_indices = get_shapekey_indices(self.obj)
+            renamed = [
+                (shape_keys.key_blocks[int(sk_indices[n])], path)
+                for n, path in new_paths.items() if sk_indices[n] >= 0
+            ]
+            # When keys swap names, a new name can still be used by a key renamed later. Move such 
+            # keys out of the way first, otherwise Blender would add a suffix to the new name.
+            taken = set(path for shapekey, path in renamed)
+            for n, (shapekey, path) in enumerate(renamed):
+                if shapekey.name in taken:
+                    shapekey.name = f'//~{n}'
+            for shapekey, path in renamed:
+                shapekey.name = path
+        
+        for n, path in new_paths.items():
+            self.shapenodes[n]['PATH'] = path
+        for pose in self.obj.extra_props.poses:
+            pose.rename_keys(paths)
+            
+    def add(self, path, is_folder):
+        node = self.shapenodes.add()
+        node.is_folder = is_folder
+        node['PATH'] = path
+        if not is_folder:
+            self.obj.shape_key_add(name=path, from_mix=False)
+    
+    def remove(self, indices):
+        """
+        Shape keys are removed through the data API, and tree nodes in a single pass afterwards,
+        so removing many nodes is linear. The reference ("Basis") shape key and its node are kept
+        while any other shape key remains.
+        """
+        obj = self.obj
+        doomed = set(indices)
+        
+        shape_keys = getattr(obj.data, 'shape_keys', None)
+        if shape_keys:
+            # Look key blocks up by name, never remove a key through an index which could be stale.
+            paths = self.get_index().paths
+            doomed_keys = {}
+            for index in doomed:
+                shapekey = None if self.shapenodes[index].is_folder else shape_keys.key_blocks.get(paths[index])
+                if shapekey is not None:
+                    doomed_keys[index] = shapekey
+                    
+            reference = shape_keys.reference_key
+            if len(doomed_keys) < len(shape_keys.key_blocks):
+                for index, shapekey in list(doomed_keys.items()):
+                    if shapekey == reference:
+                        doomed.discard(index)
+                        del doomed_keys[index]
+                
+            # The reference key, if removed at all, goes last.
+            key_blocks = sorted(doomed_keys.values(), key=lambda x: x == reference)
+            print(f"delete_nodes() INFO: {obj}, removing {len(key_blocks)} shape keys.")
+            for shapekey in key_blocks:
+                obj.shape_key_remove(shapekey)
+        
+        print(f"delete_nodes() INFO: {obj}, removing {len(doomed)} tree nodes.")
+        for index in sorted(doomed, reverse=True):
+            self.shapenodes.remove(index)
+        return doomed
+
+
+def delete_nodes(obj, paths, recursive=True):
+    """
+    Delete tree nodes with given paths, along with their shape keys and, if recursive, contents.
+    The reference ("Basis") shape key is kept while any other shape key remains. Wrap calls in
+    sync.suspended(), since every removed shape key produces a depsgraph update.
+    """
+    return Tree(CollectionStorage(obj)).delete(paths, recursive)
+
+
+def rename_nodes(obj, renames):
+    """
+    Rename tree nodes in one batch. renames maps old path -> new path. Contents of renamed folders
+    move along with them. New paths are made unique with the NameAllocator, and the mapping
+    of old -> final new path of every affected node is returned.
+    """
+    return Tree(CollectionStorage(obj)).rename(renames)
+
+
+def set_node_paths(obj, paths, allocator=None):
+    """
+    Set new paths of tree nodes and their shape keys exactly as given, old path -> new path.
+    New paths must be unique already. If the object's NameAllocator is given, new paths must
+    have been allocated by it, and old paths get released.
+    """
+    Tree(CollectionStorage(obj)).set_paths(paths, allocator)
+
+
+def set_muted(obj, paths, is_muted, recursive=True):
+    """
+    Mute or unmute nodes with given paths and, if recursive, their contents. Shape keys are
+    written with one foreach_set, and is_muted flags of folders are stored directly, without
+    triggering Node.on_muted() callbacks.
+    """
+    Tree(CollectionStorage(obj)).set_muted(paths, is_muted, recursive)
+
+
+def make_folders(obj, path):
+    """ Add the folder with given path and its parent folders, those which do not exist yet. """
+    Tree(CollectionStorage(obj)).make_folders(path)
+
+
+def move_nodes(obj, paths, dst):
+    """
+    Move nodes with given paths into the folder dst, or to the top level if dst is ''.
+    Folders are never moved into themselves.
+    """
+    return Tree(CollectionStorage(obj)).move(paths, dst)
+
+
 class Node(bpy.types.PropertyGroup):
     """
     Tree node. Member of main.ExtraObjectPropsGroup.shapenodes CollectionProperty 
     (see ExtraObjectPropsGroup class below)
     """
     is_folder: BoolProperty(name="Is folder", default=False)
-    is_collapsed: BoolProperty(name="Is collapsed", default=False)
+    is_collapsed: BoolProperty(
+        name="Is collapsed", default=False, update = lambda x, a: view_changed(x.id_data)
+    )
     
     is_ticked: BoolProperty(
         name = "Is ticked", default = False, 
@@ -110,17 +431,13 @@ class Node(bpy.types.PropertyGroup):
     def on_ticked(self):
         # Change focus to the node that is ticked
         if self.is_ticked:
-            bpy.context.object.extra_props.focused_node_index = NodeProxy(self.path).index
+            self.id_data.extra_props.focused_node_index = NodeProxy(self.path, self.id_data).index
     
     is_muted: BoolProperty(
         name = "Is muted", default = False,  update = lambda x, a: x.on_muted()
     )
     def on_muted(self):
-        if self.is_folder:
-            for node in self.children:
-                node.is_muted = self.is_muted
-        else:
-            self.shapekey.mute = self.is_muted
+        set_muted(self.id_data, [self.path], self.is_muted)
         
     
     label: StringProperty(
@@ -142,43 +459,35 @@ class Node(bpy.types.PropertyGroup):
         if self.get('PATH') == new_path:
             return
         
-        if new_path == '//Basis' and self.is_folder:
-            new_path += '0'
-            
-        while new_path in set(x.path for x in bpy.context.object.extra_props.shapenodes):
-            new_path += '0'
-            
-        if self.get('PATH') and not self.is_folder:
-            self.shapekey.name = new_path
-            
-        if self.is_folder:
-            for node in self.children:
-                node.path = f'{new_path}//{node.label}'
-                
-        self['PATH'] = new_path
+        if self.get('PATH'):
+            # Existing node: rename its shape key and the contents of the folder too.
+            rename_nodes(self.id_data, {self['PATH']: new_path})
+            return
+        
+        allocator = get_name_allocator(self.id_data)
+        self['PATH'] = allocator.allocate(new_path, self.is_folder)
+        tree_changed(self.id_data, allocator)
         
         
     @property
     def parent(self):
-        for node in bpy.context.object.extra_props.shapenodes:
-            if node.path == self.path.rpartition('//')[0]:
-                return NodeProxy(node.path)
-            
+        tree = get_tree_index(self.id_data)
+        index = tree.index.get(self.path)
+        if index is not None and tree.parent[index] is not None:
+            return NodeProxy(tree.paths[tree.parent[index]], self.id_data, tree.parent[index])
     
-    parents = property(lambda x: ([x.parent] + x.parent.parents) if x.parent else [])
-    
-    #@property
-    #def parents(self):
-        #if self.parent:
-            #yield self.parent
-            #for node in self.parent.parents:
-                #yield node
+    @property
+    def parents(self):
+        tree = get_tree_index(self.id_data)
+        index = tree.index.get(self.path)
+        if index is None:
+            return []
+        return [NodeProxy(tree.paths[x], self.id_data, x) for x in tree.get_parents(index)]
     
     @property
     def children(self):
-        for node in sorted(list(bpy.context.object.extra_props.shapenodes), key=lambda x: x.path):
-            if self.path and node.path.rpartition('//')[0:2] == (self.path, '//'):
-                yield node
+        shapenodes = self.id_data.extra_props.shapenodes
+        return [shapenodes[x] for x in get_tree_index(self.id_data).get_children(self.path)]
                 
     #@property
     #def index(self):
@@ -193,15 +502,105 @@ class Node(bpy.types.PropertyGroup):
     @property
     def shapekey(self):
         #if bpy.context.object.data.shape_keys:
-        return bpy.context.object.data.shape_keys.key_blocks.get(self.path)
+        return self.id_data.data.shape_keys.key_blocks.get(self.path)
         #return bpy.context.object.data.shape_keys.key_blocks[self.index]
         
     @property
     def sk_index(self):
-        return bpy.context.object.data.shape_keys.key_blocks.find(self.path)
+        return self.id_data.data.shape_keys.key_blocks.find(self.path)
+    
+
+    
+class Pose(bpy.types.PropertyGroup):
+    """
+    Snapshot of shape key values in a folder. Values are kept as one float32 array in the 'values'
+    ID property, and names of their shape keys in keys, separated by newlines.
+    """
+    folder: StringProperty(name="Folder", description="Folder of the pose, empty for whole tree")
+    keys: StringProperty()
+    
+    def get_values(self, obj):
+        """
+        Numpy array of pose values over key blocks of the object, NaN for keys not in the pose.
+        """
+        shape_keys = getattr(obj.data, 'shape_keys', None)
+        result = numpy.full(len(shape_keys.key_blocks) if shape_keys else 0, numpy.nan, dtype=numpy.float32)
+        if not shape_keys or not self.keys:
+            return result
+        
+        state = (get_generation(obj), get_shapekeys_fingerprint(obj), self.keys)
+        cached = _pose_indices.get((obj.as_pointer(), self.name))
+        if cached and cached[0] == state:
+            indices = cached[1]
+        else:
+            names = {name: n for n, name in enumerate(shape_keys.key_blocks.keys())}
+            indices = numpy.array([names.get(x, -1) for x in self.keys.split('\n')], dtype=numpy.int32)
+            _pose_indices[(obj.as_pointer(), self.name)] = (state, indices)
+            
+        values = numpy.array(self['values'], dtype=numpy.float32)
+        result[indices[indices >= 0]] = values[indices >= 0]
+        return result
     
+    def rename_keys(self, paths):
+        """ Follow renamed shape keys, paths maps old path -> new path. """
+        if self.keys:
+            self.keys = '\n'.join(paths.get(x, x) for x in self.keys.split('\n'))
+        if self.folder in paths:
+            self.folder = paths[self.folder]
+        
+        
+# (Object.as_pointer(), Pose.name) -> (state, key block index of every value in the pose)
+_pose_indices = {}
 
+
+def save_pose(obj, name, folder=''):
+    """
+    Save current values of shape keys in the folder, or in the whole tree if folder is empty,
+    as a pose with given name. A pose with the same name gets replaced.
+    """
+    values = get_shapekey_values(obj)
+    if folder:
+        tree = get_tree_index(obj)
+        indices = get_shapekey_indices(obj)[sorted(tree.get_subtree_indices([folder]))]
+        indices = numpy.unique(indices[indices > 0])
+    else:
+        indices = numpy.arange(1, len(values))  # Reference key value does not matter.
+    names = obj.data.shape_keys.key_blocks.keys() if len(values) else []
     
+    poses = obj.extra_props.poses
+    pose = poses.get(name) or poses.add()
+    pose.name = name
+    pose.folder = folder
+    pose.keys = '\n'.join(names[x] for x in indices)
+    pose['values'] = values[indices] if len(indices) else []
+    return pose
+
+
+def blend_poses(obj, pose_a, pose_b, factor):
+    """
+    Set shape key values to linear interpolation between two poses, in one foreach_set. A pose
+    can be None, meaning current values. Keys missing in one pose take values of the other one,
+    keys missing in both keep current values.
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    if not shape_keys:
+        return
+    current = get_shapekey_values(obj)
+    a = current if pose_a is None else pose_a.get_values(obj)
+    b = current if pose_b is None else pose_b.get_values(obj)
+    a, b = numpy.where(numpy.isnan(a), b, a), numpy.where(numpy.isnan(b), a, b)
+    
+    values = a + (b - a) * factor
+    missing = numpy.isnan(values)
+    values[missing] = current[missing]
+    shape_keys.key_blocks.foreach_set('value', values)
+    shape_keys.update_tag()
+    
+    
+def apply_pose(obj, pose, factor=1.0):
+    blend_poses(obj, None, pose, factor)
+
+
 class ExtraObjectPropsGroup(bpy.types.PropertyGroup):
     """ Per-object data and settings. """
     
@@ -212,20 +611,20 @@ class ExtraObjectPropsGroup(bpy.types.PropertyGroup):
         """
         Ensure blender internal object.active_shape_key_index follows focused tree node.
         """
-        obj = bpy.context.object
+        obj = self.id_data
         
         #if obj.extra_props.focused_node_index < 0:
         #focused_node = get_focused_node()
         
         if self.focused_node_index >= 0:
-            focused_node = NodeProxy(self.shapenodes[self.focused_node_index].path)
+            focused_node = NodeProxy(self.shapenodes[self.focused_node_index].path, obj, self.focused_node_index)
             print('focused_node', focused_node, focused_node.sk_index)
             
             obj.active_shape_key_index = focused_node.sk_index
             
             # If user previously ticked only one other node, untick it. Without this, it is not
             # obvious for user which one node will be affected - ticked or focused.
-            ticked = [NodeProxy(x.path) for x in obj.extra_props.shapenodes if x.is_ticked]
+            ticked = [NodeProxy(x.path, obj) for x in obj.extra_props.shapenodes if x.is_ticked]
             if len(ticked) == 1 and not ticked[0].path == focused_node.path:
                 ticked[0].is_ticked = False
                 
@@ -237,6 +636,14 @@ class ExtraObjectPropsGroup(bpy.types.PropertyGroup):
             
     
     driver_visible: BoolProperty(name="Show Driver", default=True)
+    driver_audit_visible: BoolProperty(
+        name="Show Driver Audit", default=False,
+        description="Show slow drivers found by the last driver audit in the tree"
+    )
+    stats_visible: BoolProperty(
+        name="Show Stats", default=False,
+        description="Show how many vertices each shape key moves and how much memory it takes"
+    )
     
     name_filter: StringProperty(name="Name filter", default='')
     name_filter_invert: BoolProperty(name="Name filter invert", default=False)
@@ -254,4 +661,24 @@ class ExtraObjectPropsGroup(bpy.types.PropertyGroup):
     value_filter_direction: BoolProperty(
         name="Greater/Less", default=False, description="Greater/Less",
     )
-
+    
+    all_selected: BoolProperty(
+        name="All Selected Objects", default=False,
+        description="Move, mute, delete, add folders and change values on all selected objects, "
+                    "matching tree nodes by path",
+    )
+    
+    poses: CollectionProperty(type=Pose)
+    poses_visible: BoolProperty(name="Show Poses", default=False)
+    
+    pose_blend_a: StringProperty(name="From pose")
+    pose_blend_b: StringProperty(name="To pose")
+    pose_blend_factor: FloatProperty(
+        name="Blend", description="Blend shape key values between two poses",
+        min=0.0, max=1.0, default=0.0, update = lambda x, a: x.on_pose_blend()
+    )
+    
+    def on_pose_blend(self):
+        pose_a, pose_b = self.poses.get(self.pose_blend_a), self.poses.get(self.pose_blend_b)
+        if pose_a and pose_b:
+            blend_poses(self.id_data, pose_a, pose_b, self.pose_blend_factor)
@@ -44,6 +44,11 @@ class MESH_MT_skt_actions(bpy.types.Menu):
             op(col, 'object.shape_key_transfer', icon='COPY_ID')
             op(col, 'object.join_shapes', icon='COPY_ID')
         
+        if len(affected) == 1 and affected[0].is_folder:
+            op(col, 'skt.bake_folder', icon='MOD_DATA_TRANSFER', op_delete_sources=False)
+            op(col, 'skt.bake_folder', icon='MOD_DATA_TRANSFER', op_delete_sources=True,
+                text="Bake Folder and Delete Sources")
+        
         col = col.column()
         if len(affected) == 1 and affected[0].path == '//Basis':
             col.enabled = True
@@ -51,9 +56,27 @@ class MESH_MT_skt_actions(bpy.types.Menu):
         op(col, 'skt.mute', icon='HIDE_ON')
         op(col, 'skt.unmute', icon='HIDE_OFF')
         col.separator()
+        draw_value_actions(col, target='SELECTED')
+        col.separator()
         op(col, 'skt.delete', icon='X')
         
 
+class MESH_MT_skt_visible_values(bpy.types.Menu):
+    bl_label = "Visible shape keys"
+    
+    def draw(self, context):
+        draw_value_actions(self.layout, target='VISIBLE')
+
+
+def draw_value_actions(layout, target):
+    op(layout, 'skt.change_values', text="Zero Values", icon='LOOP_BACK', op_action='ZERO', op_target=target)
+    op(layout, 'skt.change_values', text="Set Value...", icon='SHAPEKEY_DATA', op_action='SET', op_target=target)
+    op(layout, 'skt.change_values', text="Scale Values...", icon='FULLSCREEN_ENTER', op_action='SCALE',
+       op_target=target)
+    op(layout, 'skt.change_values', text="Randomize Values", icon='MOD_NOISE', op_action='RANDOMIZE',
+       op_target=target)
+        
+
 class MESH_MT_skt_move(bpy.types.Menu):
     bl_label = "Move to"
     
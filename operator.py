@@ -18,8 +18,8 @@
 
 import bpy
 
-from .main import NodeProxy
-from . import util
+from .main import NodeProxy, delete_nodes, move_nodes, make_folders, set_muted, save_pose, apply_pose
+from . import layout, profiling, stats, sync, util
 
 
 class Base(bpy.types.Operator):
@@ -37,10 +37,16 @@ class OBJECT_OT_move(Base):
         return context.object.mode != 'EDIT'
 
     def execute(self, context):
-        for node in util.get_ticked_or_focused():
-            if node.path not in ('//Base', self.dst):
-                node.path = f'{self.dst}//{node.label}'
-        for node in list(NodeProxy(x.path) for x in context.object.extra_props.shapenodes):
+        paths = [x.path for x in util.get_ticked_or_focused(context.object)]
+        with sync.suspended():
+            for obj in util.get_target_objects(context):
+                try:
+                    if obj != context.object and self.dst:
+                        make_folders(obj, self.dst)
+                    move_nodes(obj, util.match_paths(obj, paths), self.dst)
+                except ValueError as e:
+                    self.report({'WARNING'}, f"{obj.name}: {e}")
+        for node in context.object.extra_props.shapenodes:
             node.is_ticked = False
 
         return {'FINISHED'}
@@ -51,7 +57,12 @@ class OBJECT_OT_new_folder(Base):
     bl_label = bl_description = "New folder"
 
     def execute(self, context):
-        util.add_folder('Folder')
+        folder = util.add_folder('Folder')
+        for obj in util.get_target_objects(context)[1:]:
+            try:
+                make_folders(obj, folder.path)
+            except ValueError as e:
+                self.report({'WARNING'}, f"{obj.name}: {e}")
         return {'FINISHED'}
 
 
@@ -73,9 +84,10 @@ class OBJECT_OT_skt_shape_key_add(Base):
         return obj and obj.mode != 'EDIT' and obj.type in valid_types
 
     def execute(self, context):
-        if not list(util.get_filtered_nodes(is_folder=False)):
-            util.add_shape(path="//Basis")
-        util.add_shape(from_mix=bool(self.type == 'FROM_MIX'))
+        with sync.suspended():
+            if not list(util.get_filtered_nodes(context.object, is_folder=False)):
+                util.add_shape(path="//Basis")
+            util.add_shape(from_mix=bool(self.type == 'FROM_MIX'))
         return {'FINISHED'}
 
 
@@ -88,10 +100,11 @@ class OBJECT_OT_delete(Base):
         return context.object.mode != 'EDIT'
 
     def execute(self, context):
-        for node in util.get_ticked_or_focused():
-            print(f'Operator delete: {context.object}, {node.path}')
-            node.delete()
-        print('\n'.join(sorted([x.path for x in context.object.extra_props.shapenodes])))
+        paths = [x.path for x in util.get_ticked_or_focused(context.object)]
+        print(f'Operator delete: {context.object}, {paths}')
+        with sync.suspended():
+            for obj in util.get_target_objects(context):
+                delete_nodes(obj, util.match_paths(obj, paths))
         return {'FINISHED'}
 
 
@@ -113,7 +126,7 @@ class OBJECT_OT_select_all(Base):
     bl_label = bl_description = "Select all"
 
     def execute(self, context):
-        for node in util.get_visible_nodes():
+        for node in util.get_visible_nodes(context.object):
             if node.is_folder or node.path == '//Basis':
                 node.is_ticked = False
             else:
@@ -152,11 +165,9 @@ class OBJECT_OT_skt_mute(bpy.types.Operator):
     bl_label = bl_description = "Mute"
 
     def execute(self, context):
-        for node in util.get_ticked_or_focused():
-            if node.is_folder:
-                node.is_muted = True
-            else:
-                node.shapekey.mute = True
+        paths = [x.path for x in util.get_ticked_or_focused(context.object)]
+        for obj in util.get_target_objects(context):
+            set_muted(obj, util.match_paths(obj, paths), True)
         return {'FINISHED'}
 
 
@@ -165,11 +176,254 @@ class OBJECT_OT_skt_unmute(bpy.types.Operator):
     bl_label = bl_description = "Unmute"
 
     def execute(self, context):
-        for node in util.get_ticked_or_focused():
-            if node.is_folder:
-                node.is_muted = False
-            else:
-                node.shapekey.mute = False
+        paths = [x.path for x in util.get_ticked_or_focused(context.object)]
+        for obj in util.get_target_objects(context):
+            set_muted(obj, util.match_paths(obj, paths), False)
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_change_values(Base):
+    bl_idname = 'skt.change_values'
+    bl_label = bl_description = "Change values"
+
+    action: bpy.props.EnumProperty(
+        items=(
+            ('ZERO', "Zero", "Set values to 0"),
+            ('SET', "Set", "Set values to a constant"),
+            ('SCALE', "Scale", "Multiply values by a factor"),
+            ('RANDOMIZE', "Randomize", "Set random values within slider range"),
+        ),
+        default='ZERO',
+        options={'HIDDEN'}
+    )
+    target: bpy.props.EnumProperty(
+        items=(
+            ('SELECTED', "Selected", "Ticked nodes or focused node, including contents of folders"),
+            ('VISIBLE', "Visible", "Shape keys shown in the tree"),
+        ),
+        default='SELECTED',
+        options={'HIDDEN'}
+    )
+    value: bpy.props.FloatProperty(name="Value", default=1.0)
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and getattr(context.object.data, 'shape_keys', None)
+
+    def invoke(self, context, event):
+        if self.action in ('SET', 'SCALE'):
+            return context.window_manager.invoke_props_dialog(self)
+        return self.execute(context)
+
+    def execute(self, context):
+        if self.target == 'VISIBLE':
+            paths, recursive = [x.path for x in util.get_visible_nodes(context.object)], False
+        else:
+            paths, recursive = [x.path for x in util.get_ticked_or_focused(context.object)], True
+        for obj in util.get_target_objects(context):
+            if getattr(obj.data, 'shape_keys', None):
+                mask = util.get_shapekey_mask(obj, util.match_paths(obj, paths), recursive)
+                util.change_values(obj, mask, self.action, self.value)
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_bake_folder(Base):
+    bl_idname = 'skt.bake_folder'
+    bl_label = "Bake Folder"
+    bl_description = "Combine shape keys of the selected folder, at their current values, into one shape key"
+
+    delete_sources: bpy.props.BoolProperty(
+        name="Delete Sources", default=False,
+        description="Delete the folder with its shape keys after baking"
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        if not obj or obj.mode == 'EDIT' or obj.type not in {'MESH', 'LATTICE'}:
+            return False
+        if not getattr(obj.data, 'shape_keys', None) or not obj.data.shape_keys.use_relative:
+            return False
+        affected = util.get_ticked_or_focused(context.object)
+        return len(affected) == 1 and affected[0].is_folder
+
+    def execute(self, context):
+        folder = util.get_ticked_or_focused(context.object)[0].path
+        with sync.suspended():
+            shapekey = util.bake_folder(context.object, folder)
+            if self.delete_sources:
+                delete_nodes(context.object, [folder])
+                shapekey.value = 1.0
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_find_redundant(Base):
+    bl_idname = 'skt.find_redundant'
+    bl_label = "Find Redundant Shape Keys"
+    bl_description = "Tick shape keys which do not move any vertex, and duplicates of other shape keys"
+
+    tolerance: bpy.props.FloatProperty(
+        name="Tolerance", min=0.0, default=0.0, precision=5,
+        description="Shape keys moving no vertex further than this are considered empty"
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.mode != 'EDIT' and getattr(obj.data, 'shape_keys', None)
+
+    def execute(self, context):
+        zero_delta, duplicates = util.find_redundant_shapekeys(context.object, self.tolerance)
+        util.tick_nodes(context.object, zero_delta + duplicates)
+        self.report({'INFO'}, f"{len(zero_delta)} empty and {len(duplicates)} duplicate shape keys ticked")
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_audit_drivers(Base):
+    bl_idname = 'skt.audit_drivers'
+    bl_label = "Audit Drivers"
+    bl_description = "Tick shape keys with drivers which need Python or have many variables"
+
+    max_variables: bpy.props.IntProperty(
+        name="Max Variables", min=1, default=4,
+        description="Drivers with more variables than this are considered slow"
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and getattr(obj.data, 'shape_keys', None)
+
+    def execute(self, context):
+        audit = util.audit_drivers(context.object, self.max_variables)
+        slow = [name for name, reasons in audit.items() if reasons]
+        util.tick_nodes(context.object, slow)
+        context.object.extra_props.driver_audit_visible = True
+        
+        counts = {}
+        for reasons in audit.values():
+            for reason in reasons or ['SIMPLE']:
+                counts[reason] = counts.get(reason, 0) + 1
+        summary = ', '.join(f'{v} {k.lower().replace("_", " ")}' for k, v in sorted(counts.items()))
+        self.report({'INFO'}, f"{len(audit)} drivers, {len(slow)} slow ticked: {summary}")
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_refresh_stats(bpy.types.Operator):
+    bl_idname = 'skt.refresh_stats'
+    bl_label = bl_description = "Refresh shape key stats"
+
+    def execute(self, context):
+        stats.invalidate(context.object)
+        stats.request(context.object)
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_pose_save(Base):
+    bl_idname = 'skt.pose_save'
+    bl_label = "Save Pose"
+    bl_description = "Save values of shape keys in the focused folder, or in the whole tree, as a pose"
+
+    name: bpy.props.StringProperty(name="Name", default="Pose")
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and getattr(context.object.data, 'shape_keys', None)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        focused = util.get_focused_node(context.object)
+        save_pose(context.object, self.name, focused.path if focused and focused.is_folder else '')
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_pose_apply(Base):
+    bl_idname = 'skt.pose_apply'
+    bl_label = bl_description = "Apply Pose"
+
+    name: bpy.props.StringProperty(options={'HIDDEN'})
+    factor: bpy.props.FloatProperty(name="Factor", min=0.0, max=1.0, default=1.0)
+
+    def execute(self, context):
+        pose = context.object.extra_props.poses.get(self.name)
+        if not pose:
+            self.report({'ERROR'}, f"Pose {self.name} not found")
+            return {'CANCELLED'}
+        apply_pose(context.object, pose, self.factor)
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_pose_remove(Base):
+    bl_idname = 'skt.pose_remove'
+    bl_label = bl_description = "Remove Pose"
+
+    name: bpy.props.StringProperty(options={'HIDDEN'})
+
+    def execute(self, context):
+        poses = context.object.extra_props.poses
+        index = poses.find(self.name)
+        if index >= 0:
+            poses.remove(index)
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_layout_export(bpy.types.Operator):
+    bl_idname = 'skt.layout_export'
+    bl_label = "Export Layout"
+    bl_description = "Save folders, collapse and mute states and key folders of the tree to a file"
+    
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob: bpy.props.StringProperty(default='*.json;*.gz', options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = f'{context.object.name}_layout.json'
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        layout.save_manifest(layout.export_layout(context.object), self.filepath)
+        self.report({'INFO'}, f"Layout saved to {self.filepath}")
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_layout_apply(Base):
+    bl_idname = 'skt.layout_apply'
+    bl_label = "Apply Layout"
+    bl_description = "Move shape keys into folders and set their states as in a saved layout"
+    
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob: bpy.props.StringProperty(default='*.json;*.gz', options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.mode != 'EDIT'
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        try:
+            manifest = layout.load_manifest(self.filepath)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Can not read layout: {e}")
+            return {'CANCELLED'}
+        
+        objects = util.get_target_objects(context)
+        changed = 0
+        for obj in objects:
+            conflicts = []
+            try:
+                changed += layout.apply_layout(obj, manifest, conflicts)
+            except ValueError as e:
+                self.report({'WARNING'}, f"{obj.name}: {e}")
+            if conflicts:
+                self.report({'WARNING'}, f"{obj.name}: {len(conflicts)} shape keys not moved, "
+                                         f"their name is ambiguous or their path is taken")
+        self.report({'INFO'}, f"{changed} tree nodes changed on {len(objects)} objects")
         return {'FINISHED'}
 
 
@@ -180,7 +434,7 @@ class OBJECT_OT_skt_folder_toggle(bpy.types.Operator):
     index: bpy.props.IntProperty(options={'HIDDEN'})
 
     def execute(self, context):
-        node = NodeProxy(context.object.extra_props.shapenodes[self.index].path)
+        node = NodeProxy(context.object.extra_props.shapenodes[self.index].path, context.object, self.index)
         node.is_collapsed = not node.is_collapsed
         #print(f'toggle {node.path} now {node.is_collapsed}')
         context.object.extra_props.focused_node_index = node.index
@@ -215,3 +469,32 @@ class OBJECT_OT_skt_clear_filter(bpy.types.Operator):
         return {'FINISHED'}
 
 
+
+
+class OBJECT_OT_skt_profiling_reset(bpy.types.Operator):
+    bl_idname = 'skt.profiling_reset'
+    bl_label = bl_description = "Reset profiling stats"
+
+    def execute(self, context):
+        profiling.reset()
+        return {'FINISHED'}
+
+
+class OBJECT_OT_skt_profiling_dump(bpy.types.Operator):
+    bl_idname = 'skt.profiling_dump'
+    bl_label = "Dump Profiling Stats"
+    bl_description = "Save profiling stats to a JSON file"
+    
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob: bpy.props.StringProperty(default='*.json', options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = 'shape_tree_profile.json'
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        profiling.dump(bpy.path.abspath(self.filepath))
+        self.report({'INFO'}, f"Profiling stats saved to {self.filepath}")
+        return {'FINISHED'}
@@ -20,16 +20,27 @@
 import bpy
 import bl_ui
 
-from . import util
+from . import stats, util
 from .util import op
 
 
-def get_key_driver(name):
-    anim = bpy.context.object.data.shape_keys.animation_data
-    if anim and anim.drivers:
-        for fcu in anim.drivers:
-            if fcu.data_path == f'key_blocks["{name}"].value':
-                return fcu.driver
+def draw_poses(layout, obj):
+    props = obj.extra_props
+    box = layout.box()
+    
+    op(box, 'skt.pose_save', text="Save Pose", icon='ADD')
+    
+    for pose in props.poses:
+        row = box.row(align=True)
+        row.label(text=pose.name + (f'  ({pose.folder.replace("//", " / ")})' if pose.folder else ''))
+        op(row, 'skt.pose_apply', text="", icon='CHECKMARK', op_name=pose.name)
+        op(row, 'skt.pose_remove', text="", icon='X', op_name=pose.name)
+    
+    if len(props.poses) > 1:
+        row = box.row(align=True)
+        row.prop_search(props, 'pose_blend_a', props, 'poses', text="")
+        row.prop_search(props, 'pose_blend_b', props, 'poses', text="")
+        box.prop(props, 'pose_blend_factor', slider=True)
     
     
 class DATA_PT_shape_keys_tree(bpy.types.Panel):
@@ -73,6 +84,7 @@ class DATA_PT_shape_keys_tree(bpy.types.Panel):
         op(row, 'skt.select_all', text="All")
         op(row, 'skt.select_none', text="None")
         op(row, 'skt.select_inverse', icon='ARROW_LEFTRIGHT', text='', )
+        op(row, 'skt.find_redundant', icon='VIEWZOOM', text='', )
         
         subrow = row.row()
         subrow.alignment='RIGHT'
@@ -88,6 +100,7 @@ class DATA_PT_shape_keys_tree(bpy.types.Panel):
         
         op(row, 'skt.expand_all', text="Expand all")
         op(row, 'skt.collapse_all', text="Collapse all")
+        row.prop(obj.extra_props, 'all_selected', text="", icon='OBJECT_DATA')
         
         
         row = self.layout.row()
@@ -107,14 +120,36 @@ class DATA_PT_shape_keys_tree(bpy.types.Panel):
             rows=8)
         
         
+        if not obj.data.shape_keys:
+            return
+        
+        row = self.layout.row()
+        if util.get_driver_audit(obj) is not None:
+            row.prop(obj.extra_props, 'driver_audit_visible')
+        op(row, 'skt.audit_drivers', icon='DRIVER')
+        
+        row = self.layout.row()
+        row.prop(obj.extra_props, 'stats_visible')
+        if obj.extra_props.stats_visible:
+            stats.request(obj)
+            row.label(text='Total: ' + stats.format_stats(stats.get_stats(obj).get_total(obj)))
+            op(row, 'skt.refresh_stats', text="", icon='FILE_REFRESH')
+        
+        row = self.layout.row()
+        row.label(text="Layout")
+        op(row, 'skt.layout_export', text="Export", icon='EXPORT')
+        op(row, 'skt.layout_apply', text="Apply", icon='IMPORT')
+        
+        row = self.layout.row()
+        row.prop(obj.extra_props, 'poses_visible')
+        if obj.extra_props.poses_visible:
+            draw_poses(self.layout, obj)
+        
         split = self.layout.split(factor=0.4, align=False)
         
         row = split.row()
         row.enabled = enable_edit
         
-        if not obj.data.shape_keys:
-            return
-        
         row.prop(obj.data.shape_keys, 'use_relative')
         
         row = split.row()
@@ -133,6 +168,7 @@ class DATA_PT_shape_keys_tree(bpy.types.Panel):
         
         if obj.data.shape_keys.use_relative:
             op(sub, 'object.shape_key_clear', text="0 all")
+            sub.menu('MESH_MT_skt_visible_values', text="", icon='DOWNARROW_HLT')
         else:
             sub.operator('object.shape_key_retime', icon='RECOVER_LAST', text="")
         
@@ -180,7 +216,7 @@ class DATA_PT_shape_keys_tree(bpy.types.Panel):
             row.active = enable_edit_value
             row.prop(obj.data.shape_keys, 'eval_time')
         
-        driver = get_key_driver(focused.path)
+        driver = util.get_key_driver(obj, focused.path)
         
         if not driver:
             return
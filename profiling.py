@@ -0,0 +1,141 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import bpy
+import contextlib
+import functools
+import json
+import time
+
+
+# Opt-in instrumentation of hot paths. While disabled, measure() returns a shared no-op context
+# manager and profiled() wrappers only check a flag, so the overhead is a function call.
+_enabled = False
+_stats = {}
+
+
+class Stat:
+    """ Call count, cumulative and max time in seconds, and the same per object name. """
+    __slots__ = ('count', 'total', 'max', 'objects')
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.objects = {}
+        
+    def add(self, elapsed, obj_name):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if obj_name:
+            count, total = self.objects.get(obj_name, (0, 0.0))
+            self.objects[obj_name] = (count + 1, total + elapsed)
+            
+    def as_dict(self):
+        return {
+            'count': self.count, 'total': self.total, 'max': self.max,
+            'objects': {k: {'count': v[0], 'total': v[1]} for k, v in self.objects.items()},
+        }
+    
+    
+class Timer:
+    __slots__ = ('name', 'obj', 'start')
+    
+    def __init__(self, name, obj):
+        self.name = name
+        self.obj = obj
+        
+    def __enter__(self):
+        self.start = time.perf_counter()
+        
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        obj = self.obj if self.obj is not None else getattr(bpy.context, 'object', None)
+        if self.name not in _stats:
+            _stats[self.name] = Stat()
+        _stats[self.name].add(elapsed, obj.name if obj else '')
+        
+        
+_null_timer = contextlib.nullcontext()
+
+
+def set_enabled(value):
+    global _enabled
+    _enabled = value
+    
+    
+def is_enabled():
+    return _enabled
+
+
+def measure(name, obj=None):
+    """
+    Context manager timing the block under given name, per object obj (active object by default):
+    
+        with profiling.measure('filter_items'):
+            ...
+    """
+    return Timer(name, obj) if _enabled else _null_timer
+
+
+def profiled(name):
+    """ Decorator timing calls of a plain function under given name. """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Timer(name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument(cls, attr, name):
+    """
+    Time the (self, context) method attr of a registrable class, e.g. Operator.execute or
+    Panel.draw. Blender checks the number of arguments of registered methods, so the wrapper
+    keeps the exact signature instead of taking *args.
+    """
+    method = cls.__dict__.get(attr)
+    if method is None or getattr(method, 'profiled', False):
+        return
+    
+    @functools.wraps(method)
+    def wrapper(self, context):
+        if not _enabled:
+            return method(self, context)
+        with Timer(name, context.object):
+            return method(self, context)
+    wrapper.profiled = True
+    setattr(cls, attr, wrapper)
+
+
+def reset():
+    _stats.clear()
+    
+    
+def get_stats():
+    """ List of (name, Stat), slowest first. """
+    return sorted(_stats.items(), key=lambda x: x[1].total, reverse=True)
+
+
+def dump(filepath):
+    with open(filepath, 'w') as f:
+        json.dump({name: stat.as_dict() for name, stat in _stats.items()}, f, indent=2)
@@ -0,0 +1,205 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import bpy
+import numpy
+
+from . import main, util
+
+
+# Keys computed per timer tick, and minimal distance for a vertex to count as moved.
+CHUNK_SIZE = 64
+EPSILON = 1e-6
+
+
+class ShapeKeyStats:
+    """
+    Cached statistics of shape keys of one object: shape key name -> (vertices moved relative to
+    the reference key, bytes stored). Computed a chunk of keys at a time from a timer, see request().
+    When invalidated, shown stats are kept until a new pass over all keys completes.
+    """
+    def __init__(self):
+        self.keys = {}
+        self.version = 0
+        self.complete_state = None
+        # Pass in progress: stats computed so far, index of the next key block, state it started in.
+        self.next_keys = {}
+        self.cursor = 0
+        self.pass_state = None
+        # Key block values seen last, to tell value changes apart from edits of key data.
+        self.values = None
+        self.totals_state = None
+        self.folders = {}
+        self.total = (0, 0)
+        
+    def get_folder(self, obj, path):
+        """ Sum of stats of all shape keys in the folder. """
+        self.update_totals(obj)
+        return self.folders.get(path)
+    
+    def get_total(self, obj):
+        """ Sum of stats of all shape keys in the tree. """
+        self.update_totals(obj)
+        return self.total
+    
+    def update_totals(self, obj):
+        state = (main.get_generation(obj), self.version)
+        if self.totals_state == state:
+            return
+        self.folders = {}
+        self.total = (0, 0)
+        tree = main.get_tree_index(obj)
+        for index, path in enumerate(tree.paths):
+            if path not in self.keys:
+                continue
+            moved, size = self.keys[path]
+            self.total = (self.total[0] + moved, self.total[1] + size)
+            for parent in tree.get_parents(index):
+                folder = self.folders.get(tree.paths[parent], (0, 0))
+                self.folders[tree.paths[parent]] = (folder[0] + moved, folder[1] + size)
+        self.totals_state = state
+        
+        
+# Object.as_pointer() -> ShapeKeyStats
+_stats = {}
+_pending = set()
+
+
+def get_stats(obj) -> ShapeKeyStats:
+    if obj.as_pointer() not in _stats:
+        _stats[obj.as_pointer()] = ShapeKeyStats()
+    return _stats[obj.as_pointer()]
+
+
+def get_node_stats(obj, path, is_folder):
+    """ (moved vertices, bytes) of the node from the cache, or None if not computed yet. """
+    stats = get_stats(obj)
+    return stats.get_folder(obj, path) if is_folder else stats.keys.get(path)
+
+
+def invalidate(obj):
+    """ Recompute stats of the object on next request(), e.g. when its shape keys are edited. """
+    stats = _stats.get(obj.as_pointer())
+    if stats is not None:
+        stats.complete_state = None
+        stats.pass_state = None
+        
+        
+def on_key_update(obj):
+    """
+    Called for depsgraph updates of the object's shape keys. Dragging a value slider, applying
+    poses or animation change only values, which do not affect stats, so the object is only
+    invalidated when values stay the same: then key data itself could have been edited.
+    """
+    stats = _stats.get(obj.as_pointer())
+    if stats is None:
+        return
+    values = main.get_shapekey_values(obj)
+    if stats.values is not None and len(values) == len(stats.values) and \
+            not numpy.array_equal(values, stats.values):
+        stats.values = values
+        return
+    stats.values = values
+    invalidate(obj)
+    
+    
+def clear():
+    _stats.clear()
+    cancel()
+    
+    
+def request(obj):
+    """
+    Ensure stats of all shape keys of the object get computed. Cheap when nothing is missing,
+    the computation itself runs from a timer, so this can be called from draw().
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    if not shape_keys or obj.mode in {'EDIT', 'SCULPT'}:
+        return  # Shape key data is not up to date while editing.
+    if get_stats(obj).complete_state == get_state(obj):
+        return
+    _pending.add(obj.as_pointer())
+    if not bpy.app.timers.is_registered(_on_timer):
+        bpy.app.timers.register(_on_timer, first_interval=0)
+        
+
+def cancel():
+    _pending.clear()
+    if bpy.app.timers.is_registered(_on_timer):
+        bpy.app.timers.unregister(_on_timer)
+
+
+def _on_timer():
+    objects = {x.as_pointer(): x for x in bpy.context.scene.objects if x.as_pointer() in _pending}
+    for pointer in list(_pending):
+        # Objects which were deleted, or are not in the scene anymore, are dropped.
+        obj = objects.get(pointer)
+        if obj is None or not update(obj, CHUNK_SIZE):
+            _pending.discard(pointer)
+    util.tag_redraw()
+    return 0.01 if _pending else None
+    
+
+def get_state(obj):
+    return main.get_generation(obj), main.get_shapekeys_fingerprint(obj)
+
+
+def update(obj, limit=None):
+    """
+    Compute stats of up to limit next shape keys of the object. Returns True if the pass over
+    all keys is not complete yet.
+    """
+    stats = get_stats(obj)
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    if not shape_keys or obj.mode in {'EDIT', 'SCULPT'}:
+        return False
+    
+    state = get_state(obj)
+    if stats.complete_state == state:
+        return False
+    if stats.pass_state != state:
+        # Start a new pass. The first one fills shown stats directly, to show progress.
+        stats.next_keys = {} if stats.keys else stats.keys
+        stats.cursor = 0
+        stats.pass_state = state
+        stats.values = main.get_shapekey_values(obj)
+    
+    key_blocks = shape_keys.key_blocks
+    end = len(key_blocks) if limit is None else min(len(key_blocks), stats.cursor + limit)
+    reference_co = util.get_shapekey_coords(shape_keys.reference_key)
+    co = numpy.empty_like(reference_co)
+    for shapekey in key_blocks[stats.cursor:end]:
+        util.get_shapekey_coords(shapekey, co)
+        moved = numpy.count_nonzero((numpy.abs(co - reference_co) > EPSILON).any(axis=1))
+        stats.next_keys[shapekey.name] = (int(moved), co.nbytes)
+    stats.cursor = end
+    stats.version += 1
+    
+    if end < len(key_blocks):
+        return True
+    stats.keys = stats.next_keys
+    stats.next_keys = {}
+    stats.complete_state = state
+    return False
+
+
+def format_stats(value):
+    if value is None:
+        return '...'
+    moved, size = value
+    return f'{moved} v, {size / 1024:.0f} KB' if size < 1024 ** 2 else f'{moved} v, {size / 1024 ** 2:.1f} MB'
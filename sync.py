@@ -0,0 +1,192 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import bpy
+import contextlib
+
+from . import main, profiling
+
+
+# Object.as_pointer() -> fingerprint of the object's key blocks at the time of its last sync.
+_synced_fingerprints = {}
+
+
+def clear_fingerprints():
+    _synced_fingerprints.clear()
+
+
+@profiling.profiled('sync_node_shapekeys')
+def sync_node_shapekeys(objects=None):
+    """
+    Add tree nodes for new shape keys and remove tree nodes of deleted shape keys. Objects whose
+    key blocks did not change since their last sync are skipped. When objects are not given, all
+    objects of the scene are synced unconditionally.
+    """
+    if objects is None:
+        objects = bpy.context.scene.objects
+        _synced_fingerprints.clear()
+        
+    for obj in objects:
+        fingerprint = main.get_shapekeys_fingerprint(obj)
+        if obj.as_pointer() in _synced_fingerprints and _synced_fingerprints[obj.as_pointer()] == fingerprint:
+            continue
+        with profiling.measure('sync_object_shapekeys', obj):
+            sync_object_shapekeys(obj)
+        _synced_fingerprints[obj.as_pointer()] = main.get_shapekeys_fingerprint(obj)
+
+
+def sync_object_shapekeys(obj):
+    existing_nodes = set(main.get_tree_index(obj).index)
+    existing_shapekeys = set()
+    
+    #print(f'sync_node_shapekeys() INFO: {obj}, existing_nodes {existing_nodes}')
+    if getattr(obj.data, 'shape_keys', None):
+        #print(f'sync_node_shapekeys() INFO: {obj}, existing_shapekeys {existing_shapekeys}')
+        for shapekey in obj.data.shape_keys.key_blocks:
+            if shapekey.name in existing_nodes:
+                continue
+            print(f'sync_node_shapekeys() INFO: {obj}, adding {shapekey.name} to shape keys tree.')
+            if not shapekey.name.startswith('//'):
+                shapekey.name = '//' + shapekey.name
+            allocator = main.get_name_allocator(obj)
+            node = obj.extra_props.shapenodes.add()
+            main.tree_changed(obj, allocator)
+            node.is_folder = False
+            node.path = shapekey.name
+            if node.path != shapekey.name:
+                # Path was taken by a folder, and the node got a unique one.
+                shapekey.name = node.path
+        # New shapekeys now have //
+        existing_shapekeys = set(obj.data.shape_keys.key_blocks.keys())
+        
+    #print(f'sync_node_shapekeys() INFO: {obj}, existing_shapekeys {existing_shapekeys}')
+    removed = []
+    for index, node in enumerate(obj.extra_props.shapenodes):
+        if not node.is_folder and node.path not in existing_shapekeys:
+            print(f'sync_node_shapekeys() WARN: {obj}, {node.path} shape key does not exist, removing the tree node.')
+            removed.append((index, node.path))
+    if removed:
+        allocator = main.get_name_allocator(obj)
+        for index, path in reversed(removed):
+            obj.extra_props.shapenodes.remove(index)
+            allocator.release(path)
+        main.tree_changed(obj, allocator)
+
+
+def get_updated_objects(scene, depsgraph):
+    """
+    Objects of the scene whose shape keys could have been changed by this depsgraph update:
+    their Key datablock was updated, or their geometry was (e.g. first shape key added or the 
+    last one removed). Transform-only updates are ignored.
+    """
+    updated = set()
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Key) or update.is_updated_geometry:
+            updated.add(update.id.original.as_pointer())
+    if not updated:
+        return []
+    
+    result = []
+    for obj in scene.objects:
+        shape_keys = getattr(obj.data, 'shape_keys', None)
+        if (obj.as_pointer() in updated or (obj.data and obj.data.as_pointer() in updated)
+                or (shape_keys and shape_keys.as_pointer() in updated)):
+            result.append(obj)
+    return result
+
+
+# Scheduler. Depsgraph updates only collect objects to sync, the sync itself runs once from a
+# bpy.app.timers callback on the next idle tick. That coalesces bursts of updates (e.g. dragging
+# a value slider), and guarantees that sync never runs in the middle of an operator, which renames
+# or removes shape keys.
+_pending = set()  # Object.as_pointer() of objects waiting for sync
+_pending_all = False
+_suspended = 0
+_running = False
+
+
+def schedule(objects=None):
+    """
+    Request a deferred sync of given objects, or of all objects of the scene.
+    """
+    global _pending_all
+    if objects is None:
+        _pending_all = True
+    else:
+        _pending.update(obj.as_pointer() for obj in objects)
+    
+    if (_pending or _pending_all) and not _suspended and not bpy.app.timers.is_registered(_on_timer):
+        bpy.app.timers.register(_on_timer, first_interval=0)
+
+
+def cancel():
+    global _pending_all
+    _pending.clear()
+    _pending_all = False
+    if bpy.app.timers.is_registered(_on_timer):
+        bpy.app.timers.unregister(_on_timer)
+
+
+def _on_timer():
+    global _pending_all
+    if _suspended:
+        return None  # suspended() will schedule it again on exit.
+    
+    if _pending_all:
+        objects = None
+    else:
+        objects = [x for x in bpy.context.scene.objects if x.as_pointer() in _pending]
+    _pending.clear()
+    _pending_all = False
+    
+    sync_now(objects)
+    return None
+
+
+def sync_now(objects=None):
+    """
+    Sync immediately, unless sync is already running or suspended.
+    """
+    global _running
+    if _running or _suspended:
+        return
+    _running = True
+    try:
+        sync_node_shapekeys(objects)
+    finally:
+        _running = False
+
+
+@contextlib.contextmanager
+def suspended():
+    """
+    Suspend sync while the block runs, e.g. in operators which add, rename or remove shape keys:
+    
+        with sync.suspended():
+            bpy.ops.object.shape_key_remove()
+    
+    Updates collected meanwhile are synced on the next idle tick after the outermost block exits.
+    """
+    global _suspended
+    _suspended += 1
+    try:
+        yield
+    finally:
+        _suspended -= 1
+        if not _suspended:
+            schedule([])
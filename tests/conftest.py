@@ -0,0 +1,85 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Tests of the tree core (tree.py) run in plain Python:
+
+    python -m pytest tests
+
+Tests which need Blender are skipped there. Run them with Blender's Python, from a checkout
+named shape_tree like an installed add-on:
+
+    blender --background --factory-startup --python-expr \
+        "import sys, pytest; sys.exit(pytest.main(['shape_tree/tests']))"
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='session')
+def tree():
+    """ tree.py loaded on its own, since importing the add-on package needs Blender. """
+    spec = importlib.util.spec_from_file_location('shape_tree_core', os.path.join(ROOT, 'tree.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='session')
+def addon():
+    pytest.importorskip('bpy')
+    import addon_utils
+    sys.path.insert(0, os.path.dirname(ROOT))
+    module = addon_utils.enable(os.path.basename(ROOT), default_set=True)
+    if module is None:
+        pytest.skip('The add-on can not be enabled')
+    return module
+
+
+@pytest.fixture
+def mesh_object(addon):
+    """ Factory of mesh objects with shape keys of given names, removed after the test. """
+    import bpy
+    created = []
+    
+    def create(names):
+        mesh = bpy.data.meshes.new('Test')
+        mesh.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [], [(0, 1, 2)])
+        obj = bpy.data.objects.new('Test', mesh)
+        bpy.context.scene.collection.objects.link(obj)
+        bpy.context.view_layer.objects.active = obj
+        created.append(obj)
+        for name in names:
+            obj.shape_key_add(name=name)
+        addon.sync.sync_now([obj])
+        return obj
+    
+    yield create
+    
+    for obj in created:
+        mesh = obj.data
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
+    addon.main.clear_caches()
@@ -0,0 +1,113 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import pytest
+
+
+def get_names(obj):
+    return obj.data.shape_keys.key_blocks.keys()
+
+
+def test_delete_after_reordering_key_blocks(addon, mesh_object):
+    import bpy
+    obj = mesh_object(['//Basis', '//A', '//B', '//C'])
+    addon.main.get_shapekey_indices(obj)  # Fill the cache.
+    
+    obj.active_shape_key_index = 3
+    bpy.ops.object.shape_key_move(type='UP')
+    assert get_names(obj) == ['//Basis', '//A', '//C', '//B']
+    
+    addon.main.delete_nodes(obj, ['//B'])
+    assert get_names(obj) == ['//Basis', '//A', '//C']
+    assert [x.path for x in obj.extra_props.shapenodes] == ['//Basis', '//A', '//C']
+
+
+def test_batch_adds_basis_first(addon, mesh_object):
+    obj = mesh_object([])
+    with addon.batch(obj) as tree:
+        tree.add_shape('//Smile')
+    assert get_names(obj) == ['//Basis', '//Smile']
+    
+    
+def test_batch_does_not_move_into_shape_key(addon, mesh_object):
+    obj = mesh_object(['//Basis', '//A', '//B'])
+    with pytest.raises(ValueError):
+        with addon.batch(obj) as tree:
+            tree.move(['//A'], '//B')
+
+
+def test_apply_pose_after_reordering_key_blocks(addon, mesh_object):
+    import bpy
+    obj = mesh_object(['//Basis', '//A', '//B', '//C'])
+    for name, value in ('//A', 0.25), ('//B', 0.5), ('//C', 0.75):
+        obj.data.shape_keys.key_blocks[name].value = value
+    pose = addon.main.save_pose(obj, 'Pose')
+    addon.main.apply_pose(obj, pose)  # Fill the cache.
+    
+    obj.active_shape_key_index = 3
+    bpy.ops.object.shape_key_move(type='UP')
+    for key in obj.data.shape_keys.key_blocks:
+        key.value = 0
+    addon.main.apply_pose(obj, pose)
+    key_blocks = obj.data.shape_keys.key_blocks
+    assert [key_blocks[x].value for x in ('//A', '//B', '//C')] == [0.25, 0.5, 0.75]
+
+
+def test_value_change_keeps_stats(addon, mesh_object):
+    obj = mesh_object(['//Basis', '//A'])
+    stats = addon.stats
+    stats.request(obj)
+    stats.update(obj)
+    assert stats.get_stats(obj).complete_state == stats.get_state(obj)
+    
+    obj.data.shape_keys.key_blocks['//A'].value = 0.5
+    stats.on_key_update(obj)
+    assert stats.get_stats(obj).complete_state == stats.get_state(obj)
+    
+    stats.on_key_update(obj)  # Values did not change, key data could have been edited.
+    assert stats.get_stats(obj).complete_state is None
+    stats.clear()
+
+
+def test_bake_folder_of_inactive_object(addon, mesh_object):
+    obj = mesh_object(['//Basis', '//A'])
+    addon.main.make_folders(obj, '//F')
+    addon.main.move_nodes(obj, ['//A'], '//F')
+    key = obj.data.shape_keys.key_blocks['//F//A']
+    key.data[0].co = (0, 0, 1)
+    key.value = 0.5
+    active = mesh_object(['//Basis'])
+    
+    shapekey = addon.util.bake_folder(obj, '//F')
+    assert shapekey.id_data == obj.data.shape_keys
+    assert get_names(obj) == ['//Basis', '//F//A', '//F_baked']
+    assert get_names(active) == ['//Basis']
+    assert tuple(shapekey.data[0].co) == (0, 0, 0.5)
+
+
+def test_batch_matches_tree_operations(addon, mesh_object):
+    obj = mesh_object(['//Basis', '//A', '//B'])
+    with addon.batch(obj) as tree:
+        face = tree.add_folder('//Face')
+        assert tree.move(['//A', '//B'], face) == ['//Face//A', '//Face//B']
+        assert tree.move([face], face) == [face]  # Ignored, like Tree.move().
+        assert tree.rename('//Face//B', 'Face//A') == '//Face//A.001'
+        tree.mute(face)
+        tree.delete(['//Basis'])  # Kept while other keys remain.
+    assert get_names(obj) == ['//Basis', '//Face//A', '//Face//A.001']
+    assert [x.mute for x in obj.data.shape_keys.key_blocks] == [False, True, True]
@@ -0,0 +1,178 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import random
+
+import pytest
+
+
+def make_tree(tree, paths, folders=()):
+    folders = set(folders)
+    return tree.Tree(tree.MemoryStorage(paths, [x in folders for x in paths]))
+
+
+def test_rename_swap(tree):
+    t = make_tree(tree, ['//Basis', '//A', '//B'])
+    assert t.rename({'//A': '//B', '//B': '//A'}) == {'//A': '//B', '//B': '//A'}
+    assert t.storage.paths == ['//Basis', '//B', '//A']
+
+
+def test_folder_never_takes_basis(tree):
+    t = tree.Tree(tree.MemoryStorage())
+    assert t.add('//Basis', is_folder=True) == '//Basis.001'
+    assert t.add('//Basis') == '//Basis'
+    t.add('//F', is_folder=True)
+    assert t.rename({'//F': '//Basis'}) == {'//F': '//Basis.002'}
+
+
+def test_rename_collision(tree):
+    t = make_tree(tree, ['//Basis', '//A', '//B', '//F', '//F//A'], folders=['//F'])
+    assert t.rename({'//A': '//B'}) == {'//A': '//B.001'}
+    assert t.rename({'//F': '//B'}) == {'//F': '//B.002', '//F//A': '//B.002//A'}
+    assert sorted(t.storage.paths) == ['//B', '//B.001', '//B.002', '//B.002//A', '//Basis']
+
+
+def test_rename_moves_folder_contents(tree):
+    t = make_tree(tree, ['//F', '//F//G', '//F//G//K'], folders=['//F', '//F//G'])
+    t.rename({'//F': '//H', '//F//G//K': '//K'})  # Nodes inside a renamed folder move along.
+    assert t.storage.paths == ['//H', '//H//G', '//H//G//K']
+
+
+def test_move_into_own_subfolder_is_ignored(tree):
+    t = make_tree(tree, ['//F', '//F//Sub', '//K'], folders=['//F', '//F//Sub'])
+    assert t.move(['//F', '//K'], '//F//Sub') == {'//K': '//F//Sub//K'}
+    assert t.move(['//F'], '//F') == {}
+    assert t.rename({'//F': '//F//Sub//F', '//F//Sub': 'F//Sub//New'}) == {}
+    assert t.storage.paths == ['//F', '//F//Sub', '//F//Sub//K']
+
+
+def test_delete_keeps_reference_key(tree):
+    t = make_tree(tree, ['//Basis', '//A', '//F', '//F//B'], folders=['//F'])
+    assert t.delete(['//Basis', '//F']) == ['//F', '//F//B']
+    assert t.storage.paths == ['//Basis', '//A']
+    assert t.delete(['//Basis', '//A']) == ['//Basis', '//A']
+    assert t.storage.paths == []
+
+
+def test_get_visible_and_sort_order(tree):
+    t = make_tree(tree, ['//Z', '//Basis', '//F', '//F//B', '//F//A'], folders=['//F'])
+    assert t.get_sort_order() == [4, 0, 1, 3, 2]
+    assert t.get_visible() == [1, 2, 4, 3, 0]
+    t.storage.set_flags([2], 'is_collapsed', True)
+    assert t.get_visible() == [1, 2, 0]
+    assert t.get_visible(name_filter='z') == [2, 0]
+    assert t.get_visible(name_filter='z', invert=True) == [1, 2]
+
+
+def test_layout_round_trip(tree):
+    source = make_tree(tree, ['//Basis', '//Face', '//Face//Mouth', '//Face//Mouth//Smile',
+                              '//Face//Blink', '//Top'], folders=['//Face', '//Face//Mouth'])
+    source.storage.set_flags([2], 'is_collapsed', True)
+    source.set_muted(['//Face//Blink'], True)
+    layout = source.get_layout()
+    
+    target = make_tree(tree, ['//Basis', '//Smile', '//Blink', '//Top', '//Extra'])
+    assert target.set_layout(layout) == 6  # 2 folders, 2 moved keys, 1 collapsed, 1 muted.
+    assert sorted(target.storage.paths) == sorted(source.storage.paths + ['//Extra'])
+    result = target.get_layout()
+    assert result['keys'].pop('') == ['Extra', 'Top']
+    assert result['keys'] == {k: v for k, v in layout['keys'].items() if k}
+    assert {k: result[k] for k in ('folders', 'collapsed', 'muted')} == \
+           {k: layout[k] for k in ('folders', 'collapsed', 'muted')}
+    assert target.set_layout(layout) == 0
+    
+    # Mirrored folders reuse labels: keys are matched by path, and flags are kept for both sides.
+    paths = ['//Basis', '//L', '//L//Blink', '//R', '//R//Blink']
+    source = make_tree(tree, paths, folders=['//L', '//R'])
+    source.set_muted(['//R//Blink'], True)
+    source.storage.set_flags([3], 'is_collapsed', True)
+    layout = source.get_layout()
+    
+    target = make_tree(tree, paths, folders=['//L', '//R'])
+    assert target.set_layout(layout) == 2
+    assert target.storage.paths == paths
+    assert target.get_layout() == layout
+    
+    # A label in two folders is ambiguous for a key outside of them, which is left in place.
+    target = make_tree(tree, ['//Basis', '//Blink', '//Smile'])
+    conflicts = []
+    assert target.set_layout(dict(layout, keys={'//L': ['Blink', 'Smile'], '//R': ['Blink']}),
+                             conflicts) == 4  # 2 folders, 1 moved key, 1 collapsed folder.
+    assert conflicts == ['//Blink']
+    assert target.storage.paths == ['//Basis', '//Blink', '//L//Smile', '//L', '//R']
+
+
+def test_layout_never_renames_keys(tree):
+    layout = {'folders': ['//F', '//F//X'], 'keys': {'//F': ['X', 'Y']}, 'collapsed': [], 'muted': []}
+    target = make_tree(tree, ['//Basis', '//X', '//Y', '//Y.001', '//F//Y', '//F'], folders=['//F'])
+    conflicts = []
+    assert target.set_layout(layout, conflicts) == 1  # The missing folder.
+    assert conflicts == ['//X']
+    assert target.storage.paths == ['//Basis', '//X', '//Y', '//Y.001', '//F//Y', '//F', '//F//X']
+
+
+def check_invariants(tree, t):
+    paths = t.storage.paths
+    is_folder = t.storage.flags['is_folder']
+    assert len(set(paths)) == len(paths)
+    assert t.storage.get_allocator().taken == set(paths)
+    
+    index, fresh = t.get_index(), tree.TreeIndex(list(paths))
+    assert index.paths == fresh.paths
+    assert (index.index, index.parent, index.children, index.roots) == \
+           (fresh.index, fresh.parent, fresh.children, fresh.roots)
+    for path in paths:
+        parent = tree.split_path(path)[0]
+        assert not parent or is_folder[index.index[parent]], path
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_operations_keep_index_valid(tree, seed):
+    rng = random.Random(seed)
+    labels = ['Basis', 'A', 'B', 'B.001', 'Smile', 'F']
+    t = make_tree(tree, ['//Basis'])
+    for _ in range(60):
+        paths = t.storage.paths
+        folders = [''] + [x for n, x in enumerate(paths) if t.storage.flags['is_folder'][n]]
+        action = rng.choice(['add', 'folder', 'rename', 'move', 'delete'])
+        if action in ('add', 'folder'):
+            t.add(f'{rng.choice(folders)}//{rng.choice(labels)}', is_folder=action == 'folder')
+        elif paths and action == 'rename':
+            renames = {}
+            for path in rng.sample(paths, min(len(paths), rng.randint(1, 3))):
+                renames[path] = f'{tree.split_path(path)[0]}//{rng.choice(labels)}'
+            t.rename(renames)
+        elif paths and action == 'move':
+            t.move(rng.sample(paths, min(len(paths), rng.randint(1, 3))), rng.choice(folders))
+        elif paths and action == 'delete':
+            t.delete(rng.sample(paths, min(len(paths), rng.randint(1, 2))))
+        check_invariants(tree, t)
+
+
+def test_shape_key_in_place_of_folder(tree):
+    t = make_tree(tree, ['//Basis', '//Face', '//Eyes'], folders=['//Eyes'])
+    with pytest.raises(ValueError):
+        t.make_folders('//Face//Mouth')
+    with pytest.raises(ValueError):
+        t.move(['//Eyes'], '//Face')
+    with pytest.raises(ValueError):
+        t.set_layout({'folders': ['//Eyes//Lids', '//Face'], 'keys': {}, 'collapsed': [], 'muted': []})
+    assert t.storage.paths == ['//Basis', '//Face', '//Eyes']
+    
+    t.make_folders('//Eyes//Lids//Upper')
+    assert t.storage.paths[3:] == ['//Eyes//Lids', '//Eyes//Lids//Upper']
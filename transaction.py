@@ -0,0 +1,194 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import bpy
+import contextlib
+
+from . import main, sync, util
+from .tree import MemoryStorage, Tree
+
+
+class BatchStorage(MemoryStorage):
+    """
+    In-memory copy of the tree of an object for Batch. Besides paths and flags, every node keeps
+    its origin, the path of the existing node it stands for or None for a new node, and from_mix
+    for new shape keys.
+    """
+    def __init__(self, obj):
+        storage = main.CollectionStorage(obj)
+        paths = storage.get_paths()
+        super().__init__(paths, [bool(x) for x in storage.get_flags('is_folder')])
+        self.flags['is_muted'] = [bool(x) for x in storage.get_flags('is_muted')]
+        self.origins = list(paths)
+        self.from_mix = [False] * len(paths)
+        shape_keys = getattr(obj.data, 'shape_keys', None)
+        self.reference = shape_keys.reference_key.name if shape_keys else None
+        
+    def add(self, path, is_folder):
+        super().add(path, is_folder)
+        self.origins.append(None)
+        self.from_mix.append(False)
+        
+    def remove(self, indices):
+        indices = super().remove(indices)
+        self.origins = [x for n, x in enumerate(self.origins) if n not in indices]
+        self.from_mix = [x for n, x in enumerate(self.from_mix) if n not in indices]
+        return indices
+    
+    def get_reference_index(self):
+        if self.reference is None:
+            return None
+        return next((n for n, x in enumerate(self.origins) if x == self.reference), None)
+    
+
+class Batch:
+    """
+    Tree changes of one object, queued and validated against an in-memory copy of the tree, 
+    with the same tree.Tree operations which are applied to objects directly. Use batch() to 
+    create it. Methods take full paths, like '//Face//Smile', and raise KeyError for paths 
+    which do not exist in the tree at that point of the batch.
+    """
+    def __init__(self, obj):
+        self.obj = obj
+        self.storage = BatchStorage(obj)
+        self.tree = Tree(self.storage)
+        # Mute states of existing nodes, to apply only changed ones on commit.
+        self.muted = dict(zip(self.storage.paths, self.storage.flags['is_muted']))
+    
+    def _check(self, path):
+        if path not in self.tree.get_index().index:
+            raise KeyError(f'No tree node with path {path!r}')
+    
+    def get_subtree(self, path):
+        """ Paths of the node and all its contents, parents before children. """
+        self._check(path)
+        index = self.tree.get_index()
+        paths = [index.paths[n] for n in index.get_subtree_indices([path])]
+        return sorted(paths, key=lambda x: (x.count('//'), x))
+    
+    def add_shape(self, path, from_mix=False):
+        """ Queue a new shape key and return the path it gets. """
+        path = self.tree.add(path)
+        self.storage.from_mix[-1] = from_mix
+        return path
+    
+    def add_folder(self, path):
+        """ Queue a new folder and return the path it gets. """
+        return self.tree.add(path, is_folder=True)
+    
+    def rename(self, path, new_path):
+        """
+        Queue renaming of the node, moving folder contents along. Return the new path. Renames
+        of "Basis" and of folders into themselves are ignored, see tree.plan_renames().
+        """
+        self._check(path)
+        return self.tree.rename({path: new_path}).get(path, path)
+    
+    def move(self, paths, dst):
+        """
+        Queue moving of nodes into the folder dst, or to the top level if dst is ''. Folders are
+        never moved into themselves. Raise ValueError if dst is not a folder. Return new paths.
+        """
+        for path in paths:
+            self._check(path)
+        new_paths = self.tree.move(paths, dst)
+        return [new_paths.get(x, x) for x in paths]
+    
+    def mute(self, path, is_muted=True):
+        """ Queue muting of the node, and of all contents if it is a folder. """
+        self._check(path)
+        self.tree.set_muted([path], is_muted)
+            
+    def delete(self, paths):
+        """
+        Queue deletion of nodes and their contents. The reference shape key is kept while other
+        shape keys remain, see tree.Tree.delete().
+        """
+        for path in paths:
+            self._check(path)
+        self.tree.delete(paths)
+    
+    def commit(self):
+        """
+        Apply all queued changes to the object in one pass: deletions, then renames, then new 
+        nodes, then mute states. Then sync the object and redraw the tree once.
+        """
+        obj = self.obj
+        storage = self.storage
+        existing = set(x.path for x in obj.extra_props.shapenodes)
+        final = {x: path for x, path in zip(storage.origins, storage.paths) if x is not None}
+        added = [n for n, x in enumerate(storage.origins) if x is None]
+        is_folder = storage.flags['is_folder']
+        
+        with sync.suspended():
+            deleted = existing - set(final)
+            if deleted:
+                main.delete_nodes(obj, deleted, recursive=False)
+            
+            renamed = {old: new for old, new in final.items() if old != new}
+            if renamed:
+                main.set_node_paths(obj, renamed)
+            
+            shapenodes = obj.extra_props.shapenodes
+            if not getattr(obj.data, 'shape_keys', None) and any(not is_folder[n] for n in added):
+                # The first shape key becomes the reference one, make it "Basis" like skt.shape_key_add.
+                if '//Basis' not in final.values():
+                    shapenodes.add()['PATH'] = '//Basis'
+                obj.shape_key_add(name='//Basis', from_mix=False)
+                added = [n for n in added if storage.paths[n] != '//Basis']
+            for n in added:
+                node = shapenodes.add()
+                node.is_folder = is_folder[n]
+                node['PATH'] = storage.paths[n]
+                if not is_folder[n]:
+                    obj.shape_key_add(name=storage.paths[n], from_mix=storage.from_mix[n])
+            main.tree_changed(obj)
+            
+            self.apply_mute()
+            
+        sync.sync_now([obj])
+        util.tag_redraw()
+        
+    def apply_mute(self):
+        storage = self.storage
+        for is_muted in (True, False):
+            paths = [
+                path for path, origin, x in zip(storage.paths, storage.origins, storage.flags['is_muted'])
+                if x == is_muted and self.muted.get(origin, False) != is_muted
+            ]
+            if paths:
+                main.set_muted(self.obj, paths, is_muted, recursive=False)
+
+
+@contextlib.contextmanager
+def batch(obj=None):
+    """
+    Collect changes of the tree of the object (active object by default) and commit them at
+    once when the block exits, followed by a single sync and redraw:
+    
+        with shape_tree.batch(obj) as tree:
+            face = tree.add_folder('//Face')
+            tree.add_shape(f'{face}//Smile')
+            tree.move(['//Blink_L', '//Blink_R'], face)
+            tree.mute(face)
+    
+    Nothing is applied if the block raises.
+    """
+    result = Batch(obj or bpy.context.object)
+    yield result
+    result.commit()
@@ -0,0 +1,527 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Tree logic which does not depend on Blender: path parsing, parent/children lookup, visibility,
+sort order, renames with name collision resolution. Tree works on any Storage of nodes, like
+MemoryStorage below or main.CollectionStorage for the tree of a Blender object, so the
+algorithms can be run, benchmarked and tested in plain Python:
+
+    tree = Tree(MemoryStorage())
+    face = tree.add('//Face', is_folder=True)
+    tree.add('//Smile')
+    tree.move(['//Smile'], face)
+    assert tree.get_index().get_children(face) == [1]
+"""
+
+
+def normalize_path(path):
+    return path if path.startswith('//') else '//' + path
+
+
+def split_path(path):
+    """ Parent path ('' for top level nodes) and label of the node: '//A//B' -> ('//A', 'B'). """
+    parent, _, label = path.rpartition('//')
+    return parent, label
+
+
+class TreeIndex:
+    """
+    Lookup tables built in one pass over the paths of tree nodes. Storage.get_index() returns a
+    cached instance until the tree changes, for objects use main.get_tree_index(obj).
+    """
+    def __init__(self, paths):
+        self.paths = paths
+        self.index = {path: n for n, path in enumerate(paths)}
+        self.depth = [path.count('//') - 1 for path in paths]
+        
+        parent_paths = [path.rpartition('//')[0] for path in paths]
+        # Index of the parent node, or None for top level nodes and nodes whose folder is missing.
+        self.parent = [self.index.get(x) if x else None for x in parent_paths]
+        # Parent path -> indices of its direct children, sorted by path.
+        self.children = {}
+        # Indices of nodes without parent node, sorted by path.
+        self.roots = []
+        for n in sorted(range(len(paths)), key=paths.__getitem__):
+            if paths[n]:
+                self.children.setdefault(parent_paths[n], []).append(n)
+                if self.parent[n] is None:
+                    self.roots.append(n)
+        
+    def get_children(self, path):
+        return self.children.get(path, []) if path else []
+    
+    def get_subtree_indices(self, paths, recursive=True):
+        """ Indices of nodes with given paths and, if recursive, of all their contents. """
+        result = set()
+        stack = [self.index[x] for x in paths if x in self.index]
+        while stack:
+            index = stack.pop()
+            if index not in result:
+                result.add(index)
+                if recursive:
+                    stack.extend(self.get_children(self.paths[index]))
+        return result
+    
+    def get_parents(self, index):
+        """ Indices of all parent folders of the node, nearest first. """
+        result = []
+        index = self.parent[index]
+        while index is not None:
+            result.append(index)
+            index = self.parent[index]
+        return result
+        
+
+class NameAllocator:
+    """
+    Allocates unique tree node paths, Blender-style: "//Key", "//Key.001", "//Key.002"... Keeps
+    the set of taken paths and the next free number of every base name, so allocation is O(1)
+    amortized. Storage.get_allocator() returns the cached allocator of a tree, for objects use
+    main.get_name_allocator(obj).
+    
+    Paths in RESERVED belong to shape keys only, folders get a suffixed path instead.
+    """
+    RESERVED = frozenset(['//Basis'])
+    
+    def __init__(self, taken):
+        self.taken = set(taken)
+        self.counters = {}
+        
+    def allocate(self, path, is_folder=False):
+        if path in self.taken or (is_folder and path in self.RESERVED):
+            base, dot, number = path.rpartition('.')
+            if not (dot and number.isdigit()):
+                base = path
+            n = self.counters.get(base, 1)
+            while f'{base}.{n:03}' in self.taken:
+                n += 1
+            self.counters[base] = n + 1
+            path = f'{base}.{n:03}'
+        self.taken.add(path)
+        return path
+    
+    def release(self, path):
+        self.taken.discard(path)
+        
+
+def get_visible_indices(index, is_folder, is_collapsed, name_filter='', invert=False, hidden=None):
+    """
+    Walk the tree depth-first, skipping contents of collapsed folders, and return indices of 
+    nodes passing the name filter (label contains it, or does not if invert) whose hidden flag
+    is not set. Folders are always shown. is_folder, is_collapsed and hidden are sequences of 
+    bools indexed like the nodes, hidden may be None.
+    """
+    name_filter = name_filter.lower()
+    result = []
+    stack = index.roots[::-1]
+    while stack:
+        n = stack.pop()
+        path = index.paths[n]
+        
+        if is_folder[n]:
+            result.append(n)
+            if not is_collapsed[n]:
+                stack.extend(index.get_children(path)[::-1])
+            continue
+        
+        stack.extend(index.get_children(path)[::-1])
+        
+        if name_filter and (name_filter in split_path(path)[1].lower()) == invert:
+            continue
+        if hidden is not None and hidden[n]:
+            continue
+        result.append(n)
+    return result
+
+
+def get_sort_order(paths, is_folder):
+    """
+    Position of every node in the displayed list: "Basis" on top, then depth-first by path, 
+    folders before shape keys on every level.
+    """
+    def sortorder(n):
+        path = paths[n]
+        if path == '//Basis':
+            return '0'  # Show "Basis" always on the top of the list.
+        # Folders first: prepend foders with 0, shapekeys with 1
+        parent, label = split_path(path)
+        return f"1//{'//0'.join(parent.split('//'))}{'//0' if is_folder[n] else '//1'}{label}"
+    
+    order = [None] * len(paths)
+    for position, n in enumerate(sorted(range(len(paths)), key=sortorder)):
+        order[n] = position
+    return order
+
+
+def plan_renames(index, renames, allocator, is_folder=None):
+    """
+    Final paths of all nodes affected by renames, a dict old path -> new path, taking new paths
+    from the allocator. Contents of renamed folders move along with them, renames of nodes
+    inside a renamed folder are ignored. "Basis" is never renamed, and nodes are never moved
+    into themselves. Old paths of all affected nodes are released first, so nodes can swap
+    paths: {'//A': '//B', '//B': '//A'}. Pass is_folder flags of nodes to keep folders off
+    reserved paths, see NameAllocator.
+    """
+    renames = {old: normalize_path(new) for old, new in renames.items()}
+    roots = {
+        index.index[old]: new for old, new in renames.items()
+        if old in index.index and old != new and old != '//Basis' and not new.startswith(old + '//')
+    }
+    # Nodes inside a renamed folder are moved along with the folder.
+    roots = {k: v for k, v in roots.items() if not any(x in roots for x in index.get_parents(k))}
+    
+    for n in index.get_subtree_indices([index.paths[x] for x in roots]):
+        allocator.release(index.paths[n])
+    
+    new_paths = {}
+    for n, new_path in roots.items():
+        stack = [(n, new_path)]
+        while stack:
+            n, path = stack.pop()
+            path = allocator.allocate(path, bool(is_folder[n]) if is_folder is not None else False)
+            new_paths[n] = path
+            for child in index.get_children(index.paths[n]):
+                stack.append((child, f'{path}//{split_path(index.paths[child])[1]}'))
+    
+    return {index.paths[n]: path for n, path in new_paths.items()}
+
+
+def plan_move(paths, dst):
+    """
+    Renames which move nodes with given paths into the folder dst, or to the top level if dst
+    is ''. Folders are never moved into themselves.
+    """
+    return {
+        x: f'{dst}//{split_path(x)[1]}' for x in paths if not (dst == x or dst.startswith(x + '//'))
+    }
+
+
+class Storage:
+    """
+    Interface of a container of tree nodes, addressed by index. Indices of nodes may change
+    when nodes are removed. Subclasses implement the methods which raise NotImplementedError.
+    Tree calls changed() after every change, get_index() and get_allocator() are cached on 
+    the instance until then, subclasses may keep them elsewhere.
+    """
+    _index = None
+    _allocator = None
+    
+    def get_paths(self):
+        """ Paths of all nodes, in storage order. """
+        raise NotImplementedError
+    
+    def get_flags(self, name):
+        """ Sequence of bools of all nodes, name is 'is_folder', 'is_collapsed' or 'is_muted'. """
+        raise NotImplementedError
+    
+    def set_flags(self, indices, name, value):
+        raise NotImplementedError
+    
+    def set_paths(self, paths):
+        """ Change paths of nodes, old path -> new path. New paths are unique already. """
+        raise NotImplementedError
+    
+    def add(self, path, is_folder):
+        """ Append a node with an unique path. """
+        raise NotImplementedError
+    
+    def remove(self, indices):
+        """ Remove nodes with given indices and return indices of the removed ones. """
+        raise NotImplementedError
+    
+    def get_reference_index(self):
+        """ Index of the node of the reference shape key, or None. "Basis" by default. """
+        n = self.get_index().index.get('//Basis')
+        return n if n is not None and not self.get_flags('is_folder')[n] else None
+    
+    def get_index(self) -> TreeIndex:
+        if self._index is None:
+            self._index = TreeIndex(self.get_paths())
+        return self._index
+    
+    def get_allocator(self) -> NameAllocator:
+        if self._allocator is None:
+            self._allocator = NameAllocator(self.get_index().index)
+        return self._allocator
+    
+    def changed(self, allocator=None):
+        """ Pass the allocator, if it was kept in sync with the change. """
+        self._index = None
+        self._allocator = allocator
+        
+
+class MemoryStorage(Storage):
+    """ Tree nodes in plain lists. """
+    def __init__(self, paths=(), is_folder=None):
+        self.paths = list(paths)
+        self.flags = {
+            'is_folder': list(is_folder) if is_folder is not None else [False] * len(self.paths),
+            'is_collapsed': [False] * len(self.paths),
+            'is_muted': [False] * len(self.paths),
+        }
+    
+    def get_paths(self):
+        return self.paths
+    
+    def get_flags(self, name):
+        return self.flags[name]
+    
+    def set_flags(self, indices, name, value):
+        flags = self.flags[name]
+        for n in indices:
+            flags[n] = value
+    
+    def set_paths(self, paths):
+        index = self.get_index().index
+        for old, new in paths.items():
+            self.paths[index[old]] = new
+            
+    def add(self, path, is_folder):
+        self.paths.append(path)
+        self.flags['is_folder'].append(is_folder)
+        self.flags['is_collapsed'].append(False)
+        self.flags['is_muted'].append(False)
+        
+    def remove(self, indices):
+        indices = set(indices)
+        keep = [n for n in range(len(self.paths)) if n not in indices]
+        self.paths = [self.paths[n] for n in keep]
+        for name, flags in self.flags.items():
+            self.flags[name] = [flags[n] for n in keep]
+        return indices
+        
+        
+class Tree:
+    """
+    Operations on a tree of nodes kept in a Storage. Paths passed to methods which do not exist
+    in the tree are ignored.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+        
+    def get_index(self) -> TreeIndex:
+        return self.storage.get_index()
+    
+    def add(self, path, is_folder=False):
+        """ Add a node and return the unique path it got. """
+        allocator = self.storage.get_allocator()
+        path = allocator.allocate(normalize_path(path), is_folder)
+        self.storage.add(path, is_folder)
+        self.storage.changed(allocator)
+        return path
+    
+    def add_many(self, paths, is_folder=False):
+        """ Add nodes in one pass and return the unique paths they got. """
+        allocator = self.storage.get_allocator()
+        result = [allocator.allocate(normalize_path(x), is_folder) for x in paths]
+        for path in result:
+            self.storage.add(path, is_folder)
+        self.storage.changed(allocator)
+        return result
+    
+    def get_missing_folders(self, paths):
+        """
+        Paths of folders, parents first, which must be added so that all given folders exist.
+        Raise ValueError if one of them, or a parent, is the path of a shape key.
+        """
+        index = self.get_index().index
+        is_folder = self.storage.get_flags('is_folder')
+        missing = {}
+        for path in paths:
+            path = normalize_path(path)
+            while path:
+                n = index.get(path)
+                if n is not None and not is_folder[n]:
+                    raise ValueError(f"Shape key '{path}' is in place of a folder")
+                if n is None:
+                    missing[path] = None
+                path = split_path(path)[0]
+        return sorted(missing, key=lambda x: x.count('//'))
+    
+    def make_folders(self, path):
+        """
+        Add the folder and its parent folders which do not exist yet, like os.makedirs().
+        Raise ValueError if a shape key is in place of one of them.
+        """
+        missing = self.get_missing_folders([path])
+        if missing:
+            self.add_many(missing, is_folder=True)
+        
+    def set_paths(self, paths, allocator=None):
+        """
+        Set new paths of nodes exactly as given, old path -> new path. New paths must be unique
+        already. If the storage's allocator is given, new paths must have been allocated by it,
+        and old paths get released.
+        """
+        index = self.get_index()
+        paths = {old: new for old, new in paths.items() if old in index.index}
+        self.storage.set_paths(paths)
+        if allocator is not None:
+            for path in set(paths) - set(paths.values()):
+                allocator.release(path)
+        self.storage.changed(allocator)
+        
+    def rename(self, renames):
+        """
+        Rename nodes, old path -> new path. Contents of renamed folders move along with them.
+        New paths are made unique, and the mapping old -> final new path of every affected node
+        is returned.
+        """
+        allocator = self.storage.get_allocator()
+        renamed = plan_renames(self.get_index(), renames, allocator, self.storage.get_flags('is_folder'))
+        self.set_paths(renamed, allocator)
+        return renamed
+    
+    def move(self, paths, dst):
+        """
+        Move nodes into the folder dst, or to the top level if dst is ''. Raise ValueError if
+        dst is not a folder.
+        """
+        n = self.get_index().index.get(dst) if dst else None
+        if dst and (n is None or not self.storage.get_flags('is_folder')[n]):
+            raise ValueError(f"'{dst}' is not a folder")
+        return self.rename(plan_move(paths, dst))
+    
+    def delete(self, paths, recursive=True):
+        """
+        Delete nodes and, if recursive, their contents. The reference shape key is kept while
+        other shape keys remain. Return paths of deleted nodes.
+        """
+        index = self.get_index()
+        allocator = self.storage.get_allocator()
+        doomed = index.get_subtree_indices(paths, recursive)
+        
+        reference = self.storage.get_reference_index()
+        if reference in doomed:
+            is_folder = self.storage.get_flags('is_folder')
+            if any(not is_folder[n] for n in range(len(index.paths)) if n not in doomed):
+                doomed.discard(reference)
+        
+        removed = self.storage.remove(doomed)
+        for n in removed:
+            allocator.release(index.paths[n])
+        self.storage.changed(allocator)
+        return [index.paths[n] for n in sorted(removed)]
+    
+    def set_muted(self, paths, is_muted, recursive=True):
+        """ Mute or unmute nodes and, if recursive, their contents. """
+        indices = self.get_index().get_subtree_indices(paths, recursive)
+        self.storage.set_flags(indices, 'is_muted', is_muted)
+        
+    def get_visible(self, name_filter='', invert=False, hidden=None):
+        """ Indices of shown nodes in display order, see get_visible_indices(). """
+        return get_visible_indices(
+            self.get_index(), self.storage.get_flags('is_folder'), 
+            self.storage.get_flags('is_collapsed'), name_filter, invert, hidden
+        )
+    
+    def get_sort_order(self):
+        return get_sort_order(self.get_index().paths, self.storage.get_flags('is_folder'))
+    
+    def get_layout(self):
+        """
+        Layout of the tree as a dict of plain lists, which can be saved as JSON:
+            
+            'folders'   - paths of all folders, parents first
+            'keys'      - folder path ('' for top level) -> labels of shape keys in it
+            'collapsed' - paths of collapsed folders
+            'muted'     - paths of muted folders and shape keys
+        """
+        index = self.get_index()
+        is_folder = self.storage.get_flags('is_folder')
+        is_collapsed = self.storage.get_flags('is_collapsed')
+        is_muted = self.storage.get_flags('is_muted')
+        
+        keys = {}
+        for n in sorted(range(len(index.paths)), key=index.paths.__getitem__):
+            if not is_folder[n] and index.paths[n] != '//Basis':
+                parent, label = split_path(index.paths[n])
+                keys.setdefault(parent, []).append(label)
+                
+        return {
+            'folders': sorted(x for n, x in enumerate(index.paths) if is_folder[n]),
+            'keys': keys,
+            'collapsed': sorted(x for n, x in enumerate(index.paths) if is_folder[n] and is_collapsed[n]),
+            'muted': sorted(x for n, x in enumerate(index.paths) if is_muted[n]),
+        }
+    
+    def set_layout(self, layout, conflicts=None):
+        """
+        Bring the tree to the layout from get_layout() in one diff-based pass: add missing folders
+        at once, move shape keys into their folders with a single rename, then change collapse
+        and mute flags which differ. Nodes not in the layout are left alone. Shape keys are
+        matched by path, or else by label when it is unique both in the layout and among the
+        unmatched keys of the tree. A key is never renamed: when its label is ambiguous or its
+        new path is taken, it stays and its path is appended to conflicts, if a list is given. Return the number of changed
+        nodes. Raise ValueError, before any change, if a shape key is in place of a folder.
+        """
+        missing = self.get_missing_folders(layout['folders'])
+        index = self.get_index()
+        if missing:
+            self.add_many(missing, is_folder=True)
+            index = self.get_index()
+        
+        wanted_paths = set()
+        by_label = {}
+        for folder, labels in layout['keys'].items():
+            for label in labels:
+                path = f'{folder}//{label}'
+                wanted_paths.add(path)
+                by_label.setdefault(label, []).append(path)
+        
+        is_folder = self.storage.get_flags('is_folder')
+        unmatched = {}
+        for n, path in enumerate(index.paths):
+            if not is_folder[n] and path not in wanted_paths:
+                unmatched.setdefault(split_path(path)[1], []).append(path)
+        
+        renames = {}
+        for label, paths in unmatched.items():
+            # Layout keys of the label which have no shape key at their path yet.
+            targets = [
+                x for x in by_label.get(label, ()) if x not in index.index or is_folder[index.index[x]]
+            ]
+            if not targets:
+                continue
+            if len(paths) > 1 or len(by_label[label]) > 1 or targets[0] in index.index:
+                if conflicts is not None:
+                    conflicts.extend(paths)
+                continue
+            renames[paths[0]] = targets[0]
+        if renames:
+            self.rename(renames)
+            index = self.get_index()
+        
+        known = set(layout['folders']) | wanted_paths
+        collapsed = set(layout['collapsed'])
+        muted = set(layout['muted'])
+        
+        changed = len(missing) + len(renames)
+        for name, wanted, folders_only in ('is_collapsed', collapsed, True), ('is_muted', muted, False):
+            flags = self.storage.get_flags(name)
+            diff = {True: [], False: []}
+            for path in known:
+                n = index.index.get(path)
+                if n is not None and (is_folder[n] or not folders_only) and bool(flags[n]) != (path in wanted):
+                    diff[path in wanted].append(n)
+            for value, indices in diff.items():
+                if indices:
+                    self.storage.set_flags(indices, name, value)
+                    changed += len(indices)
+        return changed
@@ -18,8 +18,14 @@
 
 
 import bpy
+import hashlib
+import numpy
 
-from .main import NodeProxy
+from .main import (
+    NodeProxy, tree_changed, get_generation, get_tree_index, get_shapekey_indices, get_shapekey_values,
+    get_name_allocator, CollectionStorage
+)
+from .tree import Tree
 
 
 def op(row, op, **kwargs):
@@ -38,21 +44,25 @@ def op(row, op, **kwargs):
     #return [NodeProxy(x.path) for x in ordered]
             
             
-def add_shape( path=None, from_mix=False):
-    node = _add_node(path or 'Key', is_folder=False)
-    shapekey = bpy.context.object.shape_key_add(from_mix=from_mix)
+def add_shape( path=None, from_mix=False, obj=None):
+    obj = obj or bpy.context.object
+    node = _add_node(path or 'Key', is_folder=False, obj=obj)
+    shapekey = obj.shape_key_add(from_mix=from_mix)
     shapekey.name = node.path
+    return shapekey
 
 
 def add_folder(path=None):
     node = _add_node(path, is_folder=True)
     bpy.context.object.extra_props.focused_node_index = node.index
+    return node
     
     
-def _add_node(path, is_folder):
+def _add_node(path, is_folder, obj=None):
+    obj = obj or bpy.context.object
     if not path.startswith('//'):
         cur_folder = None
-        focused = get_focused_node()
+        focused = get_focused_node(obj)
         if focused:
             cur_folder = focused if focused.is_folder else focused.parent
             
@@ -61,61 +71,384 @@ def _add_node(path, is_folder):
         else:
             path = '//' + path
     
-    node = bpy.context.object.extra_props.shapenodes.add()
+    # Names are allocated in node.path setter, a new node with empty path takes none.
+    allocator = get_name_allocator(obj)
+    node = obj.extra_props.shapenodes.add()
+    tree_changed(obj, allocator)
     node.is_folder = is_folder
     node.path = path
     
-    return NodeProxy(node.path)
+    return NodeProxy(node.path, obj)
     
 
-def get_filtered_nodes(**kw):
+def get_filtered_nodes(obj=None, **kw):
     """
-    Get all nodes matching keyword:
+    Get all nodes of the object (active object by default) matching keyword:
         
         folders = get_filtered_nodes(is_folder=True)
         
     """
-    for node in bpy.context.object.extra_props.shapenodes:
+    obj = obj or bpy.context.object
+    for index, node in enumerate(obj.extra_props.shapenodes):
         if all(getattr(node, key) == kw[key] for key in kw):
-            yield NodeProxy(node.path)
+            yield NodeProxy(node.path, obj, index)
             
             
-def get_visible_nodes():
-    collapsed = set(x.path+'//' for x in get_filtered_nodes(is_folder=True, is_collapsed=True))
-    extra_props = bpy.context.object.extra_props
+def get_visible_nodes(obj=None):
+    """
+    Walk the tree of the object (active object by default) depth-first, skipping contents of
+    collapsed folders, and yield nodes passing name and value filters. Folders are always shown.
+    """
+    obj = obj or bpy.context.object
+    extra_props = obj.extra_props
+    tree = Tree(CollectionStorage(obj))
+    
+    hidden = get_filtered_by_value(obj) if extra_props.value_filter else None
+    paths = tree.get_index().paths
+    for index in tree.get_visible(extra_props.name_filter, extra_props.name_filter_invert, hidden):
+        yield NodeProxy(paths[index], obj, index)
+        
+
+def get_filtered_by_value(obj):
+    """
+    Numpy bool array, True for tree nodes whose shape key value does not pass the value filter.
+    Folders and nodes without shape key are never filtered.
+    """
+    extra_props = obj.extra_props
+    sk_indices = get_shapekey_indices(obj)
+    values = get_shapekey_values(obj)
+    
+    if extra_props.value_filter_direction:
+        passed = values >= extra_props.value_filter_threshold
+    else:
+        passed = values <= extra_props.value_filter_threshold
+    
+    has_shapekey = sk_indices >= 0
+    filtered = numpy.zeros(len(sk_indices), dtype=bool)
+    filtered[has_shapekey] = ~passed[sk_indices[has_shapekey]]
+    return filtered
+
+
+
+def get_shapekey_mask(obj, paths, recursive=True):
+    """
+    Numpy bool array over key blocks of the object, True for shape keys of nodes with given paths
+    and, if recursive, of their contents. The reference key is never included.
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    mask = numpy.zeros(len(shape_keys.key_blocks) if shape_keys else 0, dtype=bool)
+    
+    tree = get_tree_index(obj)
+    sk_indices = get_shapekey_indices(obj)[sorted(tree.get_subtree_indices(paths, recursive))]
+    mask[sk_indices[sk_indices >= 0]] = True
+    if len(mask):
+        mask[0] = False
+    return mask
+
+
+def change_values(obj, mask, action, value=0.0):
+    """
+    Change values of shape keys selected by the mask (see get_shapekey_mask()) in one
+    foreach_get/foreach_set round-trip. Action is one of:
+        
+        'ZERO'      - set values to 0
+        'SET'       - set values to value
+        'SCALE'     - multiply values by value
+        'RANDOMIZE' - set random values within slider range of each key
+        
+    Results are clamped to slider range of each key.
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    if not shape_keys or not mask.any():
+        return
+    key_blocks = shape_keys.key_blocks
     
-    for node in extra_props.shapenodes:
-        if any(node.path.startswith(x) for x in collapsed):
+    values = get_shapekey_values(obj)
+    slider_min = numpy.empty(len(values), dtype=numpy.float32)
+    slider_max = numpy.empty(len(values), dtype=numpy.float32)
+    key_blocks.foreach_get('slider_min', slider_min)
+    key_blocks.foreach_get('slider_max', slider_max)
+    
+    if action == 'ZERO':
+        values[mask] = 0
+    elif action == 'SET':
+        values[mask] = value
+    elif action == 'SCALE':
+        values[mask] *= value
+    elif action == 'RANDOMIZE':
+        values[mask] = numpy.random.uniform(slider_min[mask], slider_max[mask])
+    else:
+        raise ValueError(f'Unknown action {action!r}')
+    
+    values[mask] = numpy.clip(values[mask], slider_min[mask], slider_max[mask])
+    key_blocks.foreach_set('value', values)
+    shape_keys.update_tag()
+
+
+def get_vertex_group_weights(obj, name):
+    """
+    Numpy array of weights of all vertices (lattice points) in the vertex group, or None if
+    there is no such group.
+    """
+    group = obj.vertex_groups.get(name)
+    if group is None:
+        return None
+    elements = obj.data.vertices if obj.type == 'MESH' else obj.data.points
+    weights = numpy.zeros(len(elements), dtype=numpy.float32)
+    for n, element in enumerate(elements):
+        for x in element.groups:
+            if x.group == group.index:
+                weights[n] = x.weight
+    return weights
+
+
+def get_shapekey_coords(shapekey, out=None):
+    """
+    Numpy (n, 3) array of shape key coordinates. Pass out array to reuse it.
+    """
+    co = numpy.empty(len(shapekey.data) * 3, dtype=numpy.float32) if out is None else out.reshape(-1)
+    shapekey.data.foreach_get('co', co)
+    return co.reshape(-1, 3)
+
+
+def bake_folder(obj, folder):
+    """
+    Add a shape key next to the folder, with the sum of deltas of all shape keys in the folder,
+    weighted by their current values and vertex groups, each relative to its relative key. Muted
+    keys are skipped. Returns the new shape key.
+    """
+    shape_keys = obj.data.shape_keys
+    reference = shape_keys.reference_key
+    reference_co = get_shapekey_coords(reference)
+    
+    delta = numpy.zeros_like(reference_co)
+    relative_co = {reference.name: reference_co}
+    weights = {}
+    
+    for index in numpy.flatnonzero(get_shapekey_mask(obj, [folder])):
+        shapekey = shape_keys.key_blocks[int(index)]
+        if shapekey.mute or shapekey.value == 0:
             continue
         
-        if node.is_folder:
-            yield NodeProxy(node.path)   # Always show folders.
+        relative = shapekey.relative_key
+        if relative.name not in relative_co:
+            relative_co[relative.name] = get_shapekey_coords(relative)
+        shapekey_delta = (get_shapekey_coords(shapekey) - relative_co[relative.name]) * shapekey.value
+        
+        if shapekey.vertex_group:
+            if shapekey.vertex_group not in weights:
+                weights[shapekey.vertex_group] = get_vertex_group_weights(obj, shapekey.vertex_group)
+            if weights[shapekey.vertex_group] is not None:
+                shapekey_delta *= weights[shapekey.vertex_group][:, None]
+        delta += shapekey_delta
+        
+    shapekey = add_shape(path=f'{folder}_baked', obj=obj)
+    shapekey.data.foreach_set('co', (reference_co + delta).ravel())
+    shapekey.relative_key = reference
+    shape_keys.update_tag()
+    return shapekey
+
+
+def find_redundant_shapekeys(obj, tolerance=0.0):
+    """
+    Return two lists of shape key names: keys which move no vertex further than tolerance from
+    their relative key, and keys identical to an earlier key. Coordinates are streamed one key at
+    a time through reused buffers, only the reference key stays loaded.
+    """
+    shape_keys = obj.data.shape_keys
+    reference = shape_keys.reference_key
+    reference_co = get_shapekey_coords(reference)
+    co = numpy.empty_like(reference_co)
+    relative_co = numpy.empty_like(reference_co)
+    
+    zero_delta, duplicates = [], []
+    hashes = set()
+    for shapekey in shape_keys.key_blocks:
+        if shapekey == reference:
             continue
+        get_shapekey_coords(shapekey, co)
         
-        if extra_props.name_filter and extra_props.name_filter.lower() not in node.label.lower():
+        digest = hashlib.blake2b(co.tobytes(), digest_size=16).digest()
+        if digest in hashes:
+            duplicates.append(shapekey.name)
             continue
+        hashes.add(digest)
+        
+        if shapekey.relative_key == reference:
+            relative = reference_co
+        else:
+            relative = get_shapekey_coords(shapekey.relative_key, relative_co)
+        if numpy.abs(co - relative).max(initial=0) <= tolerance:
+            zero_delta.append(shapekey.name)
+            
+    return zero_delta, duplicates
+
+
+def tick_nodes(obj, paths):
+    """
+    Tick nodes with given paths and untick all others. Stored directly, so that focus does not
+    jump with every ticked node (see Node.on_ticked()).
+    """
+    paths = set(paths)
+    for node in obj.extra_props.shapenodes:
+        node['is_ticked'] = node.path in paths
+
+
+# Key.as_pointer() -> (state, {driver data_path: index in animation_data.drivers})
+_driver_indices = {}
+
+
+def get_value_data_path(name):
+    return f'key_blocks["{bpy.utils.escape_identifier(name)}"].value'
+
+
+def get_driver_index(obj):
+    """
+    Return dict data_path -> index in shape_keys.animation_data.drivers for the object. Cached
+    until drivers are added or removed, or the tree changes. Added drivers are appended, so the
+    data path of the last one is compared too. Use get_key_driver(), which verifies the hit.
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    anim = shape_keys and shape_keys.animation_data
+    if not anim:
+        return {}
+    
+    state = (len(anim.drivers), anim.drivers[-1].data_path if anim.drivers else '', get_generation(obj))
+    cached = _driver_indices.get(shape_keys.as_pointer())
+    if cached and cached[0] == state:
+        return cached[1]
+    
+    index = {fcu.data_path: n for n, fcu in enumerate(anim.drivers)}
+    _driver_indices[shape_keys.as_pointer()] = (state, index)
+    return index
+
+
+def get_key_driver(obj, name):
+    """
+    Return driver of value of the shape key with given name, or None.
+    """
+    data_path = get_value_data_path(name)
+    index = get_driver_index(obj).get(data_path)
+    if index is None:
+        return None
+    
+    fcurve = obj.data.shape_keys.animation_data.drivers[index]
+    if fcurve.data_path != data_path:
+        # Drivers were changed in a way which keeps their count, rebuild the index.
+        _driver_indices.pop(obj.data.shape_keys.as_pointer())
+        return get_key_driver(obj, name)
+    return fcurve.driver
+
+
+def classify_driver(driver, max_variables=4):
+    """
+    Return set of reasons why the driver is slow to evaluate, empty for fast drivers:
         
-        if extra_props.value_filter:
-            if extra_props.value_filter_direction:
-                if extra_props.value_filter_threshold > self.shapekey.value:
-                    continue
-            else:
-                if extra_props.value_filter_threshold < self.shapekey.value:
-                    continue
-                
-        yield NodeProxy(node.path)
+        'PYTHON'         - scripted expression which Blender can not evaluate without Python
+        'USE_SELF'       - scripted expression uses self, which always requires Python
+        'MANY_VARIABLES' - driver has more than max_variables variables
         
+    """
+    reasons = set()
+    if driver.type == 'SCRIPTED' and not driver.is_simple_expression:
+        reasons.add('PYTHON')
+    if driver.type == 'SCRIPTED' and driver.use_self:
+        reasons.add('USE_SELF')
+    if len(driver.variables) > max_variables:
+        reasons.add('MANY_VARIABLES')
+    return reasons
+
+
+# Object.as_pointer() -> {shape key name: reasons}, results of last audit_drivers() call.
+_driver_audits = {}
+# Object.as_pointer() -> (state, {folder path: number of slow drivers in it})
+_slow_driver_counts = {}
+
+
+def audit_drivers(obj, max_variables=4):
+    """
+    Classify drivers of all shape key values of the object with classify_driver(). Returns and
+    remembers dict shape key name -> reasons, see get_driver_audit().
+    """
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    anim = shape_keys and shape_keys.animation_data
+    result = {}
+    if anim:
+        names = {get_value_data_path(x): x for x in shape_keys.key_blocks.keys()}
+        for fcurve in anim.drivers:
+            if fcurve.data_path in names:
+                result[names[fcurve.data_path]] = classify_driver(fcurve.driver, max_variables)
+    _driver_audits[obj.as_pointer()] = result
+    _slow_driver_counts.pop(obj.as_pointer(), None)
+    return result
+
+
+def get_driver_audit(obj):
+    """ Results of the last audit_drivers() call for the object, or None. """
+    return _driver_audits.get(obj.as_pointer())
+
+
+def get_slow_driver_count(obj, path):
+    """ Number of slow drivers among shape keys in the folder, according to the last audit. """
+    audit = get_driver_audit(obj)
+    if audit is None:
+        return 0
+    
+    cached = _slow_driver_counts.get(obj.as_pointer())
+    if not cached or cached[0] != get_generation(obj):
+        counts = {}
+        tree = get_tree_index(obj)
+        for name, reasons in audit.items():
+            if reasons and name in tree.index:
+                for parent in tree.get_parents(tree.index[name]):
+                    counts[tree.paths[parent]] = counts.get(tree.paths[parent], 0) + 1
+        cached = (get_generation(obj), counts)
+        _slow_driver_counts[obj.as_pointer()] = cached
+    return cached[1].get(path, 0)
+
+
+def tag_redraw():
+    """
+    Redraw properties editors, where the tree is shown.
+    """
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'PROPERTIES':
+                area.tag_redraw()
+
+
+def get_target_objects(context):
+    """
+    Objects which tree operations apply to: the active object, followed by other selected
+    objects with shape keys if "All Selected Objects" is enabled on the active object.
+    """
+    obj = context.object
+    if not obj.extra_props.all_selected:
+        return [obj]
+    return [obj] + [
+        x for x in context.selected_objects 
+        if x != obj and x.type in {'MESH', 'LATTICE', 'CURVE', 'SURFACE'}
+        and getattr(x.data, 'shape_keys', None)
+    ]
+
+
+def match_paths(obj, paths):
+    """ Paths which exist in the tree of the object, looked up in its cached path index. """
+    index = get_tree_index(obj).index
+    return [x for x in paths if x in index]
 
 
-def get_ticked_or_focused() -> list[NodeProxy]:
+def get_ticked_or_focused(obj=None) -> list[NodeProxy]:
     """
-    If any node is ticked with a checkmark in the tree, return a list of all ticked nodes.
+    If any node is ticked with a checkmark in the tree of the object (active object by default),
+    return a list of all ticked nodes.
     Otherwise return a list with single item, focused node.
     Otherwise return empty list.
     """
-    objprops = bpy.context.object.extra_props
+    obj = obj or bpy.context.object
+    objprops = obj.extra_props
 
-    ticked = [NodeProxy(x.path) for x in objprops.shapenodes if x.is_ticked]
+    ticked = [NodeProxy(x.path, obj, n) for n, x in enumerate(objprops.shapenodes) if x.is_ticked]
     if ticked:
         return ticked
     
@@ -123,19 +456,20 @@ def get_ticked_or_focused() -> list[NodeProxy]:
         return []
     
     try:
-        return [NodeProxy(objprops.shapenodes[objprops.focused_node_index].path)]
+        return [NodeProxy(objprops.shapenodes[objprops.focused_node_index].path, obj, objprops.focused_node_index)]
     except:
         return []
 
 
-def get_focused_node() -> NodeProxy:
-    objprops = bpy.context.object.extra_props
+def get_focused_node(obj=None) -> NodeProxy:
+    obj = obj or bpy.context.object
+    objprops = obj.extra_props
 
     if objprops.focused_node_index < 0:
         return None
     
     try:
-        return NodeProxy(objprops.shapenodes[objprops.focused_node_index].path)
+        return NodeProxy(objprops.shapenodes[objprops.focused_node_index].path, obj, objprops.focused_node_index)
     except:
         # focused_node_index is invalid. Safely return None.
         return None